@@ -0,0 +1,45 @@
+import argparse
+import importlib.util
+import logging
+from typing import Literal
+
+import uvicorn
+
+from bambu import settings
+
+logger = logging.getLogger(__name__)
+
+
+EventLoop = Literal["auto", "asyncio", "uvloop"]
+EVENT_LOOPS: tuple[EventLoop, ...] = ("auto", "asyncio", "uvloop")
+
+
+def event_loop(name: str) -> EventLoop:
+    if name == "asyncio":
+        return "asyncio"
+    if name != "uvloop":
+        return "auto"
+    if importlib.util.find_spec("uvloop") is None:
+        logger.warning("uvloop is not installed, using asyncio")
+        return "asyncio"
+    return "uvloop"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the BambUI server")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--loop",
+        choices=EVENT_LOOPS,
+        default=settings.EVENT_LOOP,
+        help="auto picks uvloop when it is installed",
+    )
+    args = parser.parse_args()
+    uvicorn.run(
+        "bambu.main:app", host=args.host, port=args.port, loop=event_loop(args.loop)
+    )
+
+
+if __name__ == "__main__":
+    main()
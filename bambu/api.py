@@ -1,9 +1,35 @@
 import asyncio
-from fastapi import APIRouter
+import mimetypes
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, AsyncIterator, Iterator
+
+import aioftp
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from bambu.http_range import parse_range, range_headers
+from bambu.loop_watchdog import loop_watchdog
+from bambu.printers.admission import admission
+from bambu.printers.camera_recorder import (
+    CameraRecorder,
+    RecordingSegment,
+    iter_segment,
+    read_frame,
+)
+from bambu.printers.connection_supervisor import (
+    ConnectionUnavailable,
+    connection_supervisor,
+)
+from bambu.printers.file_cache import file_cache
+from bambu.printers.printer_ftp import PrinterFileSystemEntry
 from bambu.printers.printers import printers
 from bambu.printers.printers import SupportedPrinters, Printer
+from bambu.printers.upload_store import StoredFile
+
+RECORDING_CHUNK_SIZE = 256 * 1024
+FILE_CHUNK_SIZE = 256 * 1024
 
 router = APIRouter()
 
@@ -24,3 +50,187 @@ async def get_printers() -> list[PrinterResponse]:
     return await asyncio.gather(
         *[get_printer_status(printer) for printer in printers.values()]
     )
+
+
+def get_printer_or_404(name: str) -> Printer:
+    printer = printers.get(name)
+    if printer is None:
+        raise HTTPException(status_code=404, detail="Invalid Printer Name")
+    return printer
+
+
+@router.get("/loop")
+async def get_loop() -> dict[str, Any]:
+    return loop_watchdog.snapshot()
+
+
+@router.get("/admission")
+async def get_admission() -> dict[str, Any]:
+    return admission.snapshot()
+
+
+@router.get("/connections")
+async def get_connections() -> list[dict[str, Any]]:
+    return connection_supervisor.snapshot()
+
+
+@router.get("/printers/{name}/commands")
+async def get_printer_commands(name: str) -> dict[str, Any]:
+    return get_printer_or_404(name).command_tracker.snapshot()
+
+
+@router.get("/printers/{name}/broadcasts")
+async def get_printer_broadcasts(name: str) -> dict[str, Any]:
+    printer = get_printer_or_404(name)
+    return {
+        **printer.status_broadcaster.snapshot(),
+        "camera": printer.frame_filter.snapshot(),
+    }
+
+
+@router.get("/printers/{name}/tls")
+async def get_printer_tls(name: str) -> dict[str, Any]:
+    return get_printer_or_404(name).tls.snapshot()
+
+
+@router.get("/printers/{name}/resync")
+async def get_printer_resync(name: str) -> dict[str, Any]:
+    return get_printer_or_404(name).status_resync.snapshot()
+
+
+@router.get("/printers/{name}/uploads")
+async def get_printer_uploads(name: str) -> list[StoredFile]:
+    return list(get_printer_or_404(name).upload_store.load().values())
+
+
+def file_headers(entry: PrinterFileSystemEntry) -> dict[str, str]:
+    headers = {
+        "ETag": f'"{entry.size}-{entry.modify}"',
+        # Files on the printer can be replaced, always revalidate.
+        "Cache-Control": "private, no-cache",
+    }
+    try:
+        modified = datetime.strptime(entry.modify[:14], "%Y%m%d%H%M%S")
+        headers["Last-Modified"] = format_datetime(
+            modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+    except ValueError:
+        pass
+    return headers
+
+
+class PrinterFilesResponse(BaseModel):
+    files: list[PrinterFileSystemEntry]
+    stale: bool
+
+
+@router.get("/printers/{name}/files")
+async def list_printer_files(name: str) -> PrinterFilesResponse:
+    printer = get_printer_or_404(name)
+    try:
+        return PrinterFilesResponse(files=await printer.list_ftps_files(), stale=False)
+    except (ConnectionUnavailable, OSError, aioftp.AIOFTPException) as e:
+        # Fall back to the last known index, for example from a snapshot.
+        if printer.file_index is None:
+            raise HTTPException(status_code=503, detail=str(e) or type(e).__name__)
+        return PrinterFilesResponse(files=printer.file_index, stale=True)
+
+
+@router.get("/printers/{name}/files/{file_path:path}")
+async def download_printer_file(
+    name: str, file_path: str, request: Request
+) -> Response:
+    printer = get_printer_or_404(name)
+    try:
+        entry = await printer.stat_ftps_file(file_path)
+    except (ConnectionUnavailable, OSError, aioftp.AIOFTPException) as e:
+        raise HTTPException(status_code=503, detail=str(e) or type(e).__name__)
+    if entry is None or not entry.is_file:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    size = int(entry.size)
+    headers = file_headers(entry)
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if size == 0:
+        return Response(headers=headers)
+
+    range_header = request.headers.get("range")
+    if request.headers.get("if-range", headers["ETag"]) != headers["ETag"]:
+        range_header = None
+    byte_range = parse_range(range_header, size)
+    start, end = byte_range if byte_range is not None else (0, size - 1)
+    headers.update(range_headers(byte_range, size))
+
+    content: Iterator[bytes] | AsyncIterator[bytes]
+    if file_cache is not None:
+        cache_path = file_cache.path_for(name, file_path, size, entry.modify)
+        if await asyncio.to_thread(file_cache.lookup, cache_path, size):
+            content = iter_segment(cache_path, start, end, FILE_CHUNK_SIZE)
+        elif byte_range is None:
+            content = file_cache.tee(
+                printer.download_ftps_file(file_path), cache_path, size
+            )
+        else:
+            content = printer.download_ftps_file(file_path, start, end)
+    else:
+        content = printer.download_ftps_file(file_path, start, end)
+
+    return StreamingResponse(
+        content,
+        status_code=206 if byte_range is not None else 200,
+        media_type=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        headers=headers,
+    )
+
+
+def get_recorder_or_404(name: str) -> CameraRecorder:
+    recorder = get_printer_or_404(name).recorder
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Recording disabled")
+    return recorder
+
+
+@router.get("/printers/{name}/recordings")
+async def get_recordings(name: str) -> list[RecordingSegment]:
+    return await asyncio.to_thread(get_recorder_or_404(name).segments)
+
+
+@router.get("/printers/{name}/recordings/frame")
+async def get_recording_frame(name: str, at: float) -> Response:
+    recorder = get_recorder_or_404(name)
+    location = await asyncio.to_thread(recorder.find_frame, int(at * 1000))
+    if location is None:
+        raise HTTPException(status_code=404, detail="No recording at this time")
+    return Response(
+        content=await asyncio.to_thread(read_frame, location),
+        media_type="image/jpeg",
+        headers={"X-Frame-Timestamp": str(location.timestamp_ms / 1000)},
+    )
+
+
+@router.get("/printers/{name}/recordings/{segment_id}")
+async def get_recording_segment(
+    name: str, segment_id: int, request: Request, at: float | None = None
+) -> StreamingResponse:
+    recorder = get_recorder_or_404(name)
+    path = recorder.segment_path(segment_id)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Invalid Recording")
+
+    size = path.stat().st_size
+    byte_range = parse_range(request.headers.get("range"), size)
+    start, end = byte_range if byte_range is not None else (0, size - 1)
+    headers = range_headers(byte_range, size)
+    if byte_range is None and at is not None:
+        location = await asyncio.to_thread(recorder.find_frame, int(at * 1000))
+        if location is not None and location.segment == path:
+            start = location.offset
+            headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        iter_segment(path, start, end, RECORDING_CHUNK_SIZE),
+        status_code=206 if byte_range is not None else 200,
+        media_type="video/x-motion-jpeg",
+        headers=headers,
+    )
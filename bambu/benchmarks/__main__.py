@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from bambu.benchmarks.runner import (
+    compare,
+    format_comparison,
+    measure,
+    read_baseline,
+    write_baseline,
+)
+from bambu.benchmarks.suite import create_suite
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the per-message hot paths")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.3,
+        help="allowed slowdown against the baseline, 0.3 is 30%%",
+    )
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the new baseline"
+    )
+    args = parser.parse_args()
+
+    benchmarks = [
+        benchmark for benchmark in create_suite() if args.filter in benchmark.name
+    ]
+    loop = asyncio.new_event_loop()
+    try:
+        results = []
+        for benchmark in benchmarks:
+            results.append(measure(benchmark, loop, args.min_time, args.repeat))
+    finally:
+        loop.close()
+
+    baseline = read_baseline(args.baseline)
+    comparisons = compare(results, baseline, args.threshold)
+    print(f"{'benchmark':<48} {'median':>12} {'baseline':>12} {'change':>8}")
+    for comparison in comparisons:
+        print(format_comparison(comparison))
+
+    if args.save:
+        write_baseline(args.baseline, results, baseline)
+        print(f"Baseline written to {args.baseline}")
+    elif any(comparison.regressed for comparison in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any
+
+from bambu import serialization
+from bambu.metrics import Histogram
+from bambu.printers.mqtt_capture import (
+    CapturedReport,
+    ReplayClient,
+    capture_files,
+    load_captures,
+)
+from bambu.printers.printers import Printer
+from bambu.printers.types_ws import WsChannel
+
+REPORT_BUCKETS_MS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50)
+REPLAY_CHANNELS: frozenset[WsChannel] = frozenset({"status", "messages"})
+
+
+class ReplayPrinter(Printer):
+    replay_client: ReplayClient
+
+    def __init__(self, reports: list[CapturedReport], speed: float):
+        super().__init__(
+            name="replay",
+            ip="127.0.0.1",
+            access_code="00000000",
+            serial="REPLAY",
+            model="P1S",
+        )
+        self.mqtt_capture = None
+        self.replay_client = ReplayClient(
+            reports, f"device/{self.serial}/report", speed
+        )
+        self.report_time = Histogram(REPORT_BUCKETS_MS)
+
+    def create_mqtt_client(self) -> ReplayClient:
+        return self.replay_client
+
+    async def ping(self) -> bool:
+        return True
+
+    async def handle_report(self, raw_payload: bytes) -> None:
+        started = time.perf_counter()
+        await super().handle_report(raw_payload)
+        self.report_time.observe((time.perf_counter() - started) * 1000)
+
+
+async def run_replay(args: argparse.Namespace) -> dict[str, Any]:
+    paths = [path for capture in args.captures for path in capture_files(capture)]
+    reports = await asyncio.to_thread(load_captures, paths)
+    if not reports:
+        raise SystemExit("No captured reports found")
+
+    printer = ReplayPrinter(reports, args.speed)
+    messages = 0
+    bytes_encoded = 0
+
+    async def receive(payload: dict[str, Any]) -> None:
+        nonlocal messages, bytes_encoded
+        messages += 1
+        bytes_encoded += len(serialization.encode(payload, args.encoding))
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    async with AsyncExitStack() as stack:
+        for _ in range(args.subscribers):
+            await stack.enter_async_context(printer.client(receive, REPLAY_CHANNELS))
+        await printer.replay_client.finished.wait()
+        elapsed = time.perf_counter() - started
+        cpu_seconds = time.process_time() - cpu_started
+        # Let the last coalesced status broadcast go out.
+        await asyncio.sleep(printer.status_broadcaster.window)
+        status = dict(printer.printer_status_values)
+        await printer.disconnect()
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(status, indent=2, sort_keys=True))
+    captured_seconds = (reports[-1].timestamp_ms - reports[0].timestamp_ms) / 1000
+    return {
+        "captures": [str(path) for path in paths],
+        "reports": len(reports),
+        "captured_seconds": captured_seconds,
+        "speed": args.speed,
+        "subscribers": args.subscribers,
+        "encoding": args.encoding,
+        "elapsed_seconds": round(elapsed, 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "reports_per_second": round(len(reports) / elapsed, 1),
+        "handle_report_ms": printer.report_time.snapshot(),
+        "messages_delivered": messages,
+        "bytes_encoded": bytes_encoded,
+        "requests_published": len(printer.replay_client.published),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay captured MQTT reports through a printer and measure it"
+    )
+    parser.add_argument(
+        "captures", type=Path, nargs="+", help="capture files or directories"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="1 replays in real time, 0 as fast as possible",
+    )
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json")
+    parser.add_argument(
+        "--output", type=Path, help="write the merged printer status as JSON"
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_replay(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
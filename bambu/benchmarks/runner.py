@@ -0,0 +1,153 @@
+import asyncio
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from inspect import iscoroutinefunction
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+MIN_CALIBRATION_SECONDS = 0.05
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], Any] | Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    median_ns: float
+    min_ns: float
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "median_ns": round(self.median_ns, 1),
+            "min_ns": round(self.min_ns, 1),
+        }
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_ns: float | None
+    current_ns: float
+    threshold: float
+
+    @property
+    def change(self) -> float | None:
+        if not self.baseline_ns:
+            return None
+        return self.current_ns / self.baseline_ns - 1
+
+    @property
+    def regressed(self) -> bool:
+        return self.change is not None and self.change > self.threshold
+
+
+def timer_for(
+    func: Callable[[], Any] | Callable[[], Awaitable[Any]],
+    loop: asyncio.AbstractEventLoop,
+) -> Callable[[int], float]:
+    if iscoroutinefunction(func):
+
+        async def run_async(iterations: int) -> float:
+            started = time.perf_counter_ns()
+            for _ in range(iterations):
+                await func()
+            return time.perf_counter_ns() - started
+
+        return lambda iterations: loop.run_until_complete(run_async(iterations))
+
+    def run(iterations: int) -> float:
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            func()
+        return time.perf_counter_ns() - started
+
+    return run
+
+
+def measure(
+    benchmark: Benchmark,
+    loop: asyncio.AbstractEventLoop,
+    min_time: float = 0.2,
+    repeat: int = 5,
+) -> BenchmarkResult:
+    run = timer_for(benchmark.func, loop)
+    iterations = 1
+    while (elapsed := run(iterations)) < MIN_CALIBRATION_SECONDS * 1e9:
+        iterations *= 2
+    iterations = max(1, int(iterations * min_time * 1e9 / elapsed))
+
+    samples = [run(iterations) / iterations for _ in range(repeat)]
+    return BenchmarkResult(
+        name=benchmark.name,
+        iterations=iterations,
+        median_ns=statistics.median(samples),
+        min_ns=min(samples),
+    )
+
+
+def read_baseline(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return {"benchmarks": {}, "thresholds": {}}
+    return json.loads(path.read_text())
+
+
+def write_baseline(
+    path: Path, results: list[BenchmarkResult], previous: dict[str, Any]
+) -> None:
+    baseline = {
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "processor": platform.machine(),
+        },
+        "thresholds": previous.get("thresholds", {}),
+        # Benchmarks left out with --filter keep their previous baseline.
+        "benchmarks": {
+            **previous.get("benchmarks", {}),
+            **{result.name: result.to_json() for result in results},
+        },
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def compare(
+    results: list[BenchmarkResult], baseline: dict[str, Any], threshold: float
+) -> list[Comparison]:
+    thresholds = baseline.get("thresholds", {})
+    return [
+        Comparison(
+            name=result.name,
+            baseline_ns=baseline["benchmarks"].get(result.name, {}).get("median_ns"),
+            current_ns=result.median_ns,
+            threshold=thresholds.get(result.name, threshold),
+        )
+        for result in results
+    ]
+
+
+def format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} ns"
+
+
+def format_comparison(comparison: Comparison) -> str:
+    baseline = (
+        "-" if comparison.baseline_ns is None else format_ns(comparison.baseline_ns)
+    )
+    change = "new" if comparison.change is None else f"{comparison.change:+.1%}"
+    status = "REGRESSION" if comparison.regressed else ""
+    return (
+        f"{comparison.name:<48} {format_ns(comparison.current_ns):>12} "
+        f"{baseline:>12} {change:>8} {status}"
+    )
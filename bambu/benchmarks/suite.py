@@ -0,0 +1,170 @@
+import json
+import struct
+import time
+from typing import Any
+
+from bambu import serialization
+from bambu.benchmarks.runner import Benchmark
+from bambu.printers import printer_payload as pl
+from bambu.printers.async_camera_client import (
+    JPEG_END,
+    JPEG_START,
+    READ_CHUNK_SIZE,
+    AsyncCameraClient,
+)
+from bambu.printers.frame_filter import thumbnail
+from bambu.printers.printers import Printer, Subscriber
+from bambu.printers.types_printer import PrinterRequest
+from bambu.printers.types_ws import ALL_CHANNELS, WsJpegImage
+from bambu.simulator.reports import SimulatedPrintState
+from bambu.simulator.simulated_printer import render_frames
+
+FANOUT_SUBSCRIBERS = (1, 10, 100)
+
+REQUESTS: list[dict[str, Any]] = [
+    {"type": "chamber_light", "enable": True},
+    {"type": "bed_temp", "temperature": 60},
+    {"type": "print_speed", "speed": 3},
+    {"type": "move_x", "distance": 10},
+    {"type": "calibrate"},
+]
+
+
+def create_printer() -> Printer:
+    printer = Printer(
+        name="benchmark",
+        ip="127.0.0.1",
+        access_code="00000000",
+        serial="BENCHMARK",
+        model="P1S",
+    )
+    # Broadcast right away, a pending flush task would outlive the benchmark.
+    printer.status_broadcaster.window = 0
+    # Pretend the full push arrived so no pushall request is published.
+    report = SimulatedPrintState("BENCHMARK").full_report()["print"]
+    printer.printer_status_values = dict(report)
+    printer.status_resync.update(report, time.monotonic())
+    printer.status_resync.requested(time.monotonic())
+    return printer
+
+
+def camera_stream_chunks() -> tuple[list[bytes], int]:
+    frames = render_frames(10, width=1280, height=720)
+    stream = b"".join(
+        struct.pack("<IIII", len(frame), 0, 1, 0) + frame for frame in frames
+    )
+    chunks = [
+        stream[offset : offset + READ_CHUNK_SIZE]
+        for offset in range(0, len(stream), READ_CHUNK_SIZE)
+    ]
+    return chunks, len(frames)
+
+
+def camera_extraction() -> Benchmark:
+    client = AsyncCameraClient("127.0.0.1", "00000000")
+    chunks, frame_count = camera_stream_chunks()
+
+    def extract() -> None:
+        buf = bytearray()
+        found = 0
+        for data in chunks:
+            buf += data
+            img, buf = client.__find_jpeg__(buf, JPEG_START, JPEG_END)
+            if img:
+                found += 1
+        assert found == frame_count
+
+    return Benchmark(f"camera.extract_jpeg[{frame_count} frames]", extract)
+
+
+def frame_thumbnail() -> Benchmark:
+    frame = render_frames(1, width=1280, height=720)[0]
+    return Benchmark("frame_filter.thumbnail[1280x720]", lambda: thumbnail(frame))
+
+
+def jpeg_encoding() -> Benchmark:
+    frame = render_frames(1, width=1280, height=720)[0]
+    return Benchmark("ws.jpeg_image_from_bytes", lambda: WsJpegImage.from_bytes(frame))
+
+
+def status_report(kind: str) -> Benchmark:
+    printer = create_printer()
+    state = SimulatedPrintState("BENCHMARK")
+    report = state.full_report() if kind == "full" else state.delta_report()
+    raw = json.dumps(report).encode()
+
+    async def handle() -> None:
+        await printer.handle_report(raw)
+
+    return Benchmark(f"printer.handle_report[{kind}]", handle)
+
+
+def request_parsing() -> Benchmark:
+    def parse() -> None:
+        for request in REQUESTS:
+            PrinterRequest.from_printer_json(request)
+
+    return Benchmark(f"printer_request.from_printer_json[{len(REQUESTS)}]", parse)
+
+
+def payload_builders() -> Benchmark:
+    def build() -> None:
+        pl.enable_light(True)
+        pl.bed_temp_command(60)
+        pl.extruder_temp_command(220)
+        pl.generate_payload_speed_level(3)
+        pl.move_x_command(10)
+        pl.home_command()
+        pl.pushall_command()
+        pl.calibration(True, True, True)
+        pl.start_print_file("benchy.3mf")
+
+    return Benchmark("printer_payload.builders[9]", build)
+
+
+def fanout(subscribers: int) -> Benchmark:
+    printer = create_printer()
+
+    async def send_payload(data: dict[str, Any]) -> None:
+        serialization.encode(data, "json")
+
+    for index in range(subscribers):
+        printer.subscribers[str(index)] = Subscriber(send_payload, ALL_CHANNELS)
+    payload = {"type": "printer_status", "data": printer.printer_status_values}
+
+    async def broadcast() -> None:
+        await printer.callback_all_connected_ws(payload, channel="status")
+
+    return Benchmark(f"printer.callback_all_connected_ws[{subscribers}]", broadcast)
+
+
+def report_encoding(encoding: serialization.WsEncoding) -> Benchmark:
+    payload = {
+        "type": "printer_status",
+        "data": SimulatedPrintState("BENCHMARK").full_report()["print"],
+    }
+    return Benchmark(
+        f"serialization.encode[{encoding}]",
+        lambda: serialization.encode_uncached(payload, encoding),
+    )
+
+
+def report_decoding() -> Benchmark:
+    raw = json.dumps(SimulatedPrintState("BENCHMARK").full_report()).encode()
+    return Benchmark("serialization.loads", lambda: serialization.loads(raw))
+
+
+def create_suite() -> list[Benchmark]:
+    return [
+        camera_extraction(),
+        frame_thumbnail(),
+        jpeg_encoding(),
+        status_report("delta"),
+        status_report("full"),
+        request_parsing(),
+        payload_builders(),
+        *(fanout(subscribers) for subscribers in FANOUT_SUBSCRIBERS),
+        report_encoding("json"),
+        report_encoding("msgpack"),
+        report_decoding(),
+    ]
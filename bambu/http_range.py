@@ -0,0 +1,46 @@
+import re
+
+from fastapi import HTTPException
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    if not header:
+        return None
+
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        raise HTTPException(
+            status_code=416,
+            detail="Invalid Range",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        start, end = 0, size - 1
+    elif first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range Not Satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def range_headers(byte_range: tuple[int, int] | None, size: int) -> dict[str, str]:
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+    return headers
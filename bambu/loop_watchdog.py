@@ -0,0 +1,158 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from logging import getLogger
+from typing import Any
+
+from bambu import settings
+from bambu.metrics import Histogram
+
+logger = getLogger(__name__)
+
+LAG_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+STALL_HISTORY = 20
+STACK_LIMIT = 25
+PRINTER_TASK_PREFIX = "printer/"
+
+
+def printer_task_name(printer_name: str, role: str) -> str:
+    return f"{PRINTER_TASK_PREFIX}{printer_name}/{role}"
+
+
+def task_counts() -> dict[str, Any]:
+    printers: dict[str, Counter[str]] = {}
+    other: Counter[str] = Counter()
+    for task in asyncio.all_tasks():
+        name = task.get_name()
+        if name.startswith(PRINTER_TASK_PREFIX):
+            printer_name, _, role = name[len(PRINTER_TASK_PREFIX) :].rpartition("/")
+            printers.setdefault(printer_name, Counter())[role] += 1
+        else:
+            # Unnamed tasks are called Task-<n>, count them together.
+            other["unnamed" if name.startswith("Task-") else name] += 1
+    return {
+        "total": sum(other.values())
+        + sum(sum(roles.values()) for roles in printers.values()),
+        "printers": {name: dict(roles) for name, roles in printers.items()},
+        "other": dict(other),
+    }
+
+
+class LoopWatchdog:
+    loop: asyncio.AbstractEventLoop | None
+    heartbeat_task: asyncio.Task | None
+    thread: threading.Thread | None
+    current_stall: dict[str, Any] | None
+
+    def __init__(self) -> None:
+        self.interval = settings.LOOP_WATCHDOG_INTERVAL
+        self.threshold = settings.LOOP_STALL_THRESHOLD
+        self.lag = Histogram(LAG_BUCKETS_MS)
+        self.stalls: deque[dict[str, Any]] = deque(maxlen=STALL_HISTORY)
+        self.stall_count = 0
+        self.loop = None
+        self.loop_thread_id = 0
+        self.last_beat = time.monotonic()
+        self.current_stall = None
+        self.peak_lag = 0.0
+        self.stall_started = 0.0
+        self.heartbeat_task = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self.heartbeat_task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopping.clear()
+        self.heartbeat_task = asyncio.create_task(
+            self.heartbeat(), name="watchdog/heartbeat"
+        )
+        self.thread = threading.Thread(
+            target=self.sample, name="loop-watchdog", daemon=True
+        )
+        self.thread.start()
+
+    async def stop(self) -> None:
+        self.stopping.set()
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        if self.thread is not None:
+            await asyncio.to_thread(self.thread.join)
+            self.thread = None
+
+    async def heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.last_beat = time.monotonic()
+            lag = self.last_beat - started - self.interval
+            self.lag.observe(lag * 1000)
+            self.peak_lag = max(self.peak_lag, lag)
+
+    def take_peak_lag(self) -> float:
+        # Worst lag since the previous call, in seconds.
+        peak, self.peak_lag = self.peak_lag, 0.0
+        return peak
+
+    def sample(self) -> None:
+        # Runs in its own thread, the loop cannot report on itself while it is blocked.
+        while not self.stopping.wait(self.interval):
+            blocked = time.monotonic() - self.last_beat - self.interval
+            if blocked >= self.threshold:
+                if self.current_stall is None:
+                    self.capture_stall(blocked)
+            elif self.current_stall is not None:
+                self.end_stall()
+
+    def capture_stall(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = traceback.format_stack(frame, limit=STACK_LIMIT) if frame else []
+        task = asyncio.current_task(self.loop) if self.loop is not None else None
+        self.stall_started = time.monotonic() - blocked
+        self.current_stall = {
+            "started_at": time.time() - blocked,
+            "duration_ms": None,
+            "task": task.get_name() if task is not None else None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.stall_count += 1
+        self.stalls.append(self.current_stall)
+        if settings.LOOP_STALL_LOG:
+            logger.warning(
+                "Event loop blocked for %.0f ms in %s\n%s",
+                blocked * 1000,
+                self.current_stall["task"],
+                "".join(stack),
+            )
+
+    def end_stall(self) -> None:
+        if self.current_stall is None:
+            return
+        self.current_stall["duration_ms"] = round(
+            (self.last_beat - self.stall_started) * 1000
+        )
+        if settings.LOOP_STALL_LOG:
+            logger.warning(
+                "Event loop resumed after %d ms", self.current_stall["duration_ms"]
+            )
+        self.current_stall = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": self.lag.snapshot(),
+            "stall_count": self.stall_count,
+            "stalls": list(self.stalls),
+            "tasks": task_counts(),
+        }
+
+
+loop_watchdog = LoopWatchdog()
@@ -1,15 +1,61 @@
 import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from bambu import settings
+from bambu.loop_watchdog import loop_watchdog
+from bambu.printers.admission import admission
 from bambu.printers.printer_ws import router as ws_router
 from bambu.api import router as api_router
+from bambu.printers.fleet import router as fleet_router
+from bambu.printers.job_queue import dispatcher, router as jobs_router
+from bambu.printers.printer_sessions import FleetSessions
+from bambu.printers.printers import printers
+from bambu.printers.registry import registry
+from bambu.printers.types_ws import CAMERA_CHANNELS
+from bambu.printers.warm_snapshot import snapshots
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Recording needs the camera running even when nobody watches.
+recording_sessions = FleetSessions(CAMERA_CHANNELS)
+
+
+async def close_printer_files() -> None:
+    for printer in list(printers.values()):
+        if printer.recorder is not None:
+            await printer.recorder.close()
+        if printer.mqtt_capture is not None:
+            await printer.mqtt_capture.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    loop_watchdog.start()
+    admission.start()
+    await snapshots.start()
+    registry.start()
+    await dispatcher.start()
+    if settings.RECORDING_DIR is not None:
+        await recording_sessions.start()
+    try:
+        yield
+    finally:
+        await snapshots.stop()
+        await recording_sessions.stop()
+        await close_printer_files()
+        await dispatcher.stop()
+        await registry.stop()
+        await admission.stop()
+        await loop_watchdog.stop()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,4 +72,6 @@ async def healthz() -> dict[str, str]:
 
 
 app.include_router(api_router, prefix="/api")
+app.include_router(fleet_router, prefix="/api/fleet")
+app.include_router(jobs_router, prefix="/api/jobs")
 app.include_router(ws_router, prefix="/ws")
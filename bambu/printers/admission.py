@@ -0,0 +1,238 @@
+import asyncio
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Any, Iterator, Literal
+
+from fastapi import WebSocket
+
+from bambu import serialization, settings
+from bambu.loop_watchdog import loop_watchdog
+
+logger = getLogger(__name__)
+
+LoadLevel = Literal["normal", "reduced", "status_only", "reject"]
+LOAD_LEVELS: tuple[LoadLevel, ...] = ("normal", "reduced", "status_only", "reject")
+# Pressure at which reduced, status_only and reject start, 1 is a signal at its limit.
+LEVEL_PRESSURE: tuple[float, ...] = (1.0, 1.5, 2.0)
+TRY_AGAIN_LATER = 1013
+# A newer payload of these types makes the queued one worthless.
+SUPERSEDING_TYPES = frozenset(("jpeg_image", "printer_status"))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Seconds until a token is available, 0 when one was taken.
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ClientConnection:
+    queue: deque[dict[str, Any]]
+    sender: asyncio.Task | None
+
+    def __init__(self, websocket: WebSocket, encoding: serialization.WsEncoding):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.sender = None
+        self.frame_accepted_at = 0.0
+        self.dropped = 0
+        self.commands = TokenBucket(settings.WS_COMMAND_RATE, settings.WS_COMMAND_BURST)
+
+    async def offer(self, payload: dict[str, Any]) -> None:
+        # Never waits on the client, a slow one only falls behind on its own queue.
+        kind = payload.get("type")
+        if kind == "jpeg_image":
+            if not admission.allows_frame(self.frame_accepted_at):
+                self.dropped += 1
+                return
+            self.frame_accepted_at = time.monotonic()
+        if kind in SUPERSEDING_TYPES:
+            for index, queued in enumerate(self.queue):
+                if queued.get("type") == kind:
+                    self.queue[index] = payload
+                    self.dropped += 1
+                    return
+        if len(self.queue) >= settings.WS_SEND_QUEUE:
+            self.dropped += 1
+            return
+        self.queue.append(payload)
+        self.ready.set()
+
+    async def send_queued(self) -> None:
+        while True:
+            await self.ready.wait()
+            while self.queue:
+                payload = self.queue.popleft()
+                await serialization.send_payload(self.websocket, payload, self.encoding)
+            self.ready.clear()
+
+    def start(self, name: str) -> None:
+        self.sender = asyncio.create_task(self.send_queued(), name=name)
+
+    async def stop(self) -> None:
+        if self.sender is not None:
+            self.sender.cancel()
+            await asyncio.gather(self.sender, return_exceptions=True)
+            self.sender = None
+
+
+class AdmissionController:
+    connections: set[ClientConnection]
+    clients: Counter[str | None]
+    pressure: dict[str, float]
+    task: asyncio.Task | None
+
+    def __init__(self) -> None:
+        self.connections = set()
+        self.clients = Counter()
+        self.level: LoadLevel = "normal"
+        self.pressure = {}
+        self.rejected = 0
+        self.commands_limited = 0
+        self.task = None
+
+    def refusal(self, printer_name: str | None = None) -> str | None:
+        retry = f"retry after {settings.OVERLOAD_RETRY_AFTER}s"
+        if self.level == "reject":
+            return f"Server overloaded, {retry}"
+        if settings.WS_MAX_CLIENTS and self.clients.total() >= settings.WS_MAX_CLIENTS:
+            return f"Too many connections, {retry}"
+        if (
+            printer_name is not None
+            and settings.WS_MAX_CLIENTS_PER_PRINTER
+            and self.clients[printer_name] >= settings.WS_MAX_CLIENTS_PER_PRINTER
+        ):
+            return f"Too many connections to {printer_name}, {retry}"
+        return None
+
+    def reserve(self, printer_name: str | None = None) -> str | None:
+        # Taken before the first await so concurrent handshakes cannot overshoot.
+        if (reason := self.refusal(printer_name)) is not None:
+            self.rejected += 1
+            return reason
+        self.clients[printer_name] += 1
+        return None
+
+    async def admit(
+        self, websocket: WebSocket, printer_name: str | None = None
+    ) -> bool:
+        if (reason := self.reserve(printer_name)) is None:
+            return True
+        logger.warning("Refused connection from %s: %s", websocket.client, reason)
+        # Accepted first, a close before the handshake never reaches the client.
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER, reason=reason)
+        return False
+
+    @contextmanager
+    def admitted(
+        self,
+        printer_name: str | None = None,
+        connection: ClientConnection | None = None,
+    ) -> Iterator[None]:
+        # Releases the slot reserved by admit() or reserve().
+        if connection is not None:
+            self.connections.add(connection)
+        try:
+            yield None
+        finally:
+            self.clients[printer_name] -= 1
+            if connection is not None:
+                self.connections.discard(connection)
+
+    def allows_frame(self, last_accepted: float) -> bool:
+        if self.level == "normal":
+            return True
+        if self.level == "reduced" and settings.OVERLOAD_REDUCED_FPS > 0:
+            return time.monotonic() - last_accepted >= 1 / settings.OVERLOAD_REDUCED_FPS
+        return False
+
+    def queue_fill(self) -> float:
+        if not self.connections or settings.WS_SEND_QUEUE <= 0:
+            return 0.0
+        queued = sum(len(connection.queue) for connection in self.connections)
+        return queued / (len(self.connections) * settings.WS_SEND_QUEUE)
+
+    def update(self, loop_lag: float, cpu: float, queue_fill: float) -> None:
+        signals = {
+            "loop_lag": (loop_lag, settings.OVERLOAD_LOOP_LAG),
+            "cpu": (cpu, settings.OVERLOAD_CPU),
+            "queue": (queue_fill, settings.OVERLOAD_QUEUE),
+        }
+        self.pressure = {
+            name: value / limit if limit > 0 else 0.0
+            for name, (value, limit) in signals.items()
+        }
+        target = bisect_right(LEVEL_PRESSURE, max(self.pressure.values()))
+        current = LOAD_LEVELS.index(self.level)
+        # Recovers one level per check so a short dip does not flap between levels.
+        level = LOAD_LEVELS[target if target > current else max(target, current - 1)]
+        if level != self.level:
+            logger.warning(
+                "Load level %s -> %s, pressure %s",
+                self.level,
+                level,
+                {name: round(value, 2) for name, value in self.pressure.items()},
+            )
+            self.level = level
+
+    async def monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = settings.OVERLOAD_CHECK_INTERVAL
+        started, cpu_started = loop.time(), time.process_time()
+        while True:
+            await asyncio.sleep(interval)
+            now, cpu_now = loop.time(), time.process_time()
+            loop_lag = max(now - started - interval, loop_watchdog.take_peak_lag())
+            cpu = (cpu_now - cpu_started) / (now - started)
+            self.update(loop_lag, cpu, self.queue_fill())
+            started, cpu_started = now, cpu_now
+
+    def start(self) -> None:
+        if settings.OVERLOAD_CHECK_INTERVAL <= 0 or self.task is not None:
+            return
+        self.task = asyncio.create_task(self.monitor(), name="admission")
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "level": self.level,
+            "pressure": self.pressure,
+            "clients": self.clients.total(),
+            "printers": {
+                name: count
+                for name, count in self.clients.items()
+                if name is not None and count
+            },
+            "queued": sum(len(connection.queue) for connection in self.connections),
+            "dropped": sum(connection.dropped for connection in self.connections),
+            "rejected": self.rejected,
+            "commands_limited": self.commands_limited,
+        }
+
+
+admission = AdmissionController()
@@ -1,33 +1,55 @@
-import ssl
 import logging
+import time
 
 import asyncio
 from bambu_connect.CameraClient import CameraClient
 
+from bambu.loop_watchdog import printer_task_name
+from bambu.printers.connection_supervisor import connection_supervisor
+from bambu.printers.printer_tls import PrinterTls
+
 
 logger = logging.getLogger(__name__)
 
 logger = logging.getLogger(__name__)
 
+JPEG_START = bytearray([0xFF, 0xD8, 0xFF, 0xE0])
+JPEG_END = bytearray([0xFF, 0xD9])
+READ_CHUNK_SIZE = 4096
 
-class AsyncCameraClient(CameraClient):
-    async def capture_stream(self, img_callback):
-        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
 
-        jpeg_start = bytearray([0xFF, 0xD8, 0xFF, 0xE0])
-        jpeg_end = bytearray([0xFF, 0xD9])
-        read_chunk_size = 4096
+class AsyncCameraClient(CameraClient):
+    def __init__(self, hostname, access_code, port=6000, name=None, tls=None):
+        super().__init__(hostname, access_code, port)
+        self.name = name or hostname
+        self.tls = tls or PrinterTls()
+
+    async def open_connection(self):
+        started = time.perf_counter()
+        connection = await asyncio.open_connection(
+            host=self.hostname, port=self.port, ssl=self.tls.context("camera")
+        )
+        _, writer = connection
+        self.tls.connected(
+            "camera",
+            time.perf_counter() - started,
+            writer.get_extra_info("ssl_object"),
+        )
+        return connection
 
+    async def capture_stream(self, img_callback):
         while self.streaming:
             try:
-                reader, writer = await asyncio.open_connection(
-                    host=self.hostname, port=self.port, ssl=ctx
+                reader, writer = await connection_supervisor.attempt(
+                    self.name, "camera", self.open_connection
                 )
+            except Exception as e:
+                logger.error(f"Connection error: {e}")
+                continue
 
-                logger.info("Connected to server")
-
+            logger.info("Connected to server")
+            error = None
+            try:
                 writer.write(self.auth_packet)
                 await writer.drain()
 
@@ -36,27 +58,29 @@ class AsyncCameraClient(CameraClient):
                 while self.streaming:
                     try:
                         data = await asyncio.wait_for(
-                            reader.read(read_chunk_size), timeout=5
+                            reader.read(READ_CHUNK_SIZE), timeout=5
                         )
                         if not data:
                             break
 
                         buf += data
-                        img, buf = self.__find_jpeg__(buf, jpeg_start, jpeg_end)
+                        img, buf = self.__find_jpeg__(buf, JPEG_START, JPEG_END)
                         if img:
+                            connection_supervisor.confirm(self.name, "camera")
                             await img_callback(bytes(img))
 
                     except Exception as e:
                         logger.error("Error reading stream: %s", e)
+                        error = e
                         break
-
+            finally:
+                connection_supervisor.disconnected(self.name, "camera", error)
                 writer.close()
-                await writer.wait_closed()
 
+            try:
+                await writer.wait_closed()
             except Exception as e:
-                logger.error(f"Connection error: {e}")
-                await asyncio.sleep(1)
-                break
+                logger.error("Error closing stream: %s", e)
 
     async def start_stream(self, img_callback):
         if self.streaming:
@@ -67,14 +91,18 @@ class AsyncCameraClient(CameraClient):
 
         def on_done(task: asyncio.tasks.Task):
             try:
-                task.result()
+                if not task.cancelled():
+                    task.result()
             except Exception as e:
                 logger.error(f"Stream task encountered an error: {e}")
             finally:
                 self.streaming = False
 
         try:
-            self.stream_task = asyncio.create_task(self.capture_stream(img_callback))
+            self.stream_task = asyncio.create_task(
+                self.capture_stream(img_callback),
+                name=printer_task_name(self.name, "camera"),
+            )
             self.stream_task.add_done_callback(on_done)
         except Exception as e:
             logger.error(f"An error occurred while starting the stream: {e}")
@@ -87,4 +115,6 @@ class AsyncCameraClient(CameraClient):
 
         self.streaming = False
         if self.stream_task:
-            await self.stream_task
+            # The task may be waiting out a reconnect backoff.
+            self.stream_task.cancel()
+            await asyncio.gather(self.stream_task, return_exceptions=True)
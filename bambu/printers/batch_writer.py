@@ -0,0 +1,80 @@
+import asyncio
+import time
+from contextlib import suppress
+from logging import getLogger
+from pathlib import Path
+
+from bambu.loop_watchdog import printer_task_name
+
+logger = getLogger(__name__)
+
+
+class BatchWriter:
+    # Buffers timestamped payloads on the loop and writes them in a worker thread.
+    directory: Path
+    pending: list[tuple[int, bytes]]
+    flush_task: asyncio.Task | None
+
+    def __init__(self, directory: Path, flush_interval: float, kind: str):
+        # Writers live in a directory named after the printer.
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.kind = kind
+        self.pending = []
+        self.flush_task = None
+        self.closing = asyncio.Event()
+        # One write or close at a time, the files are not thread safe.
+        self.lock = asyncio.Lock()
+
+    def add(self, payload: bytes) -> None:
+        self.pending.append((int(time.time() * 1000), payload))
+        # close() writes whatever arrives while it runs.
+        if not self.closing.is_set() and (
+            self.flush_task is None or self.flush_task.done()
+        ):
+            self.schedule_flush()
+
+    def schedule_flush(self) -> None:
+        self.flush_task = asyncio.create_task(
+            self.flush_later(), name=printer_task_name(self.directory.name, self.kind)
+        )
+
+    async def flush_later(self) -> None:
+        # Cut short by close(), a write already running in a thread cannot be cancelled.
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self.closing.wait(), self.flush_interval)
+        await self.flush()
+        if self.pending and not self.closing.is_set():
+            self.schedule_flush()
+
+    async def flush(self) -> None:
+        async with self.lock:
+            await self.write_pending()
+
+    async def write_pending(self) -> None:
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.write_batch, batch)
+        except OSError:
+            logger.exception("Writing %s to %s failed", self.kind, self.directory)
+
+    async def close(self) -> None:
+        self.closing.set()
+        try:
+            if self.flush_task is not None:
+                await asyncio.gather(self.flush_task, return_exceptions=True)
+            async with self.lock:
+                await self.write_pending()
+                await asyncio.to_thread(self.close_files)
+        finally:
+            self.closing.clear()
+        if self.pending:
+            self.schedule_flush()
+
+    def write_batch(self, batch: list[tuple[int, bytes]]) -> None:
+        raise NotImplementedError
+
+    def close_files(self) -> None:
+        raise NotImplementedError
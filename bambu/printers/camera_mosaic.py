@@ -0,0 +1,110 @@
+import asyncio
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageDraw
+
+from bambu import settings
+from bambu.printers.printers import Printer
+
+MOSAIC_QUALITY = 70
+BACKGROUND = (24, 24, 24)
+LABEL_HEIGHT = 14
+
+# Pillow releases the GIL while decoding, scaling and encoding.
+mosaic_executor = ThreadPoolExecutor(
+    max_workers=settings.MOSAIC_WORKERS, thread_name_prefix="mosaic"
+)
+
+
+@dataclass
+class Tile:
+    source: bytes | None
+    image: Image.Image
+
+
+def label_tile(image: Image.Image, label: str) -> None:
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, image.width, LABEL_HEIGHT), fill=BACKGROUND)
+    draw.text((4, 1), label, fill=(255, 255, 255))
+
+
+def scale_tile(jpeg: bytes | None, size: tuple[int, int], label: str) -> Image.Image:
+    tile = Image.new("RGB", size, BACKGROUND)
+    if jpeg is not None:
+        frame = Image.open(io.BytesIO(jpeg))
+        # Decode at a reduced scale right away, the tile is a fraction of the frame.
+        frame.draft("RGB", size)
+        image = frame.convert("RGB")
+        image.thumbnail(size, Image.Resampling.BILINEAR)
+        tile.paste(image, ((size[0] - image.width) // 2, (size[1] - image.height) // 2))
+    label_tile(tile, label)
+    return tile
+
+
+def compose(tiles: list[Image.Image], size: tuple[int, int], columns: int) -> bytes:
+    rows = max(1, math.ceil(len(tiles) / columns))
+    mosaic = Image.new("RGB", (size[0] * columns, size[1] * rows), BACKGROUND)
+    for index, tile in enumerate(tiles):
+        row, column = divmod(index, columns)
+        mosaic.paste(tile, (column * size[0], row * size[1]))
+    output = io.BytesIO()
+    mosaic.save(output, format="JPEG", quality=MOSAIC_QUALITY)
+    return output.getvalue()
+
+
+class MosaicComposer:
+    tiles: dict[str, Tile]
+    frame: bytes | None
+
+    def __init__(self, tile_size: tuple[int, int], columns: int | None = None):
+        self.tile_size = tile_size
+        self.columns = columns
+        self.tiles = {}
+        self.frame = None
+        self.layout: tuple[str, ...] = ()
+        self.frames = 0
+        self.tiles_scaled = 0
+
+    def label(self, printer: Printer) -> str:
+        if printer.latest_image is None:
+            return f"{printer.name} (no image)"
+        if printer.image_restored:
+            return f"{printer.name} (stale)"
+        return printer.name
+
+    async def scale(self, printer: Printer) -> None:
+        image = printer.latest_image
+        tile = await asyncio.get_running_loop().run_in_executor(
+            mosaic_executor, scale_tile, image, self.tile_size, self.label(printer)
+        )
+        self.tiles[printer.name] = Tile(source=image, image=tile)
+        self.tiles_scaled += 1
+
+    async def render(self, selected: list[Printer]) -> bytes:
+        # Frames are compared by identity, every new camera frame is a new object.
+        changed = [
+            printer
+            for printer in selected
+            if (tile := self.tiles.get(printer.name)) is None
+            or tile.source is not printer.latest_image
+        ]
+        await asyncio.gather(*[self.scale(printer) for printer in changed])
+
+        layout = tuple(printer.name for printer in selected)
+        if self.frame is not None and not changed and layout == self.layout:
+            return self.frame
+
+        columns = self.columns or max(1, math.ceil(math.sqrt(len(selected))))
+        self.frame = await asyncio.get_running_loop().run_in_executor(
+            mosaic_executor,
+            compose,
+            [self.tiles[name].image for name in layout],
+            self.tile_size,
+            columns,
+        )
+        self.layout = layout
+        self.frames += 1
+        return self.frame
@@ -0,0 +1,209 @@
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from pydantic import BaseModel
+
+from bambu import settings
+from bambu.printers.batch_writer import BatchWriter
+
+logger = getLogger(__name__)
+
+# timestamp in ms, offset into the segment, frame length
+INDEX_RECORD = struct.Struct("<QQI")
+SEGMENT_SUFFIX = ".mjpeg"
+INDEX_SUFFIX = ".idx"
+
+
+class RecordingSegment(BaseModel):
+    id: int
+    start: float
+    end: float
+    frames: int
+    size: int
+
+
+@dataclass
+class FrameLocation:
+    segment: Path
+    timestamp_ms: int
+    offset: int
+    length: int
+
+
+class IndexTimestamps:
+    def __init__(self, index: mmap.mmap):
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.index) // INDEX_RECORD.size
+
+    def __getitem__(self, position: int) -> int:
+        return INDEX_RECORD.unpack_from(self.index, position * INDEX_RECORD.size)[0]
+
+
+class CameraRecorder(BatchWriter):
+    def __init__(self, directory: Path):
+        super().__init__(directory, settings.RECORDING_FLUSH_INTERVAL, "recording")
+        self.segment_id: int | None = None
+        self.segment_file: BinaryIO | None = None
+        self.index_file: BinaryIO | None = None
+        self.segment_size = 0
+
+    def add_frame(self, image: bytes) -> None:
+        self.add(image)
+
+    def close_files(self) -> None:
+        self.close_segment()
+
+    def segment_path(self, segment_id: int) -> Path:
+        return self.directory / f"{segment_id}{SEGMENT_SUFFIX}"
+
+    def index_path(self, segment_id: int) -> Path:
+        return self.directory / f"{segment_id}{INDEX_SUFFIX}"
+
+    def open_segment(self, timestamp_ms: int) -> None:
+        self.close_segment()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_id = timestamp_ms
+        # Kept open across batches, close_segment() closes them.
+        self.segment_file = self.segment_path(timestamp_ms).open("ab")
+        self.index_file = self.index_path(timestamp_ms).open("ab")
+        self.segment_size = self.segment_file.tell()
+        self.apply_retention()
+
+    def close_segment(self) -> None:
+        for file in (self.segment_file, self.index_file):
+            if file is not None:
+                file.close()
+        self.segment_file = None
+        self.index_file = None
+        self.segment_id = None
+
+    def needs_rotation(self, timestamp_ms: int) -> bool:
+        if self.segment_id is None:
+            return True
+        age = (timestamp_ms - self.segment_id) / 1000
+        return (
+            age >= settings.RECORDING_SEGMENT_SECONDS
+            or self.segment_size >= settings.RECORDING_SEGMENT_BYTES
+        )
+
+    def write_batch(self, batch: list[tuple[int, bytes]]) -> None:
+        for timestamp_ms, image in batch:
+            if self.needs_rotation(timestamp_ms):
+                self.open_segment(timestamp_ms)
+            assert self.segment_file is not None and self.index_file is not None
+            self.segment_file.write(image)
+            self.index_file.write(
+                INDEX_RECORD.pack(timestamp_ms, self.segment_size, len(image))
+            )
+            self.segment_size += len(image)
+        if self.segment_file is not None and self.index_file is not None:
+            self.segment_file.flush()
+            self.index_file.flush()
+
+    def segment_ids(self) -> list[int]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            int(path.stem)
+            for path in self.directory.glob(f"*{SEGMENT_SUFFIX}")
+            if path.stem.isdigit()
+        )
+
+    def apply_retention(self) -> None:
+        segment_ids = self.segment_ids()
+        sizes = {
+            segment_id: self.segment_path(segment_id).stat().st_size
+            + self.index_path(segment_id).stat().st_size
+            for segment_id in segment_ids
+            if self.index_path(segment_id).exists()
+        }
+        total = sum(sizes.values())
+        oldest_allowed = (time.time() - settings.RECORDING_MAX_AGE) * 1000
+
+        for segment_id in segment_ids:
+            if segment_id == self.segment_id:
+                break
+            if total <= settings.RECORDING_MAX_BYTES and segment_id >= oldest_allowed:
+                break
+            total -= sizes.get(segment_id, 0)
+            self.segment_path(segment_id).unlink(missing_ok=True)
+            self.index_path(segment_id).unlink(missing_ok=True)
+            logger.info("Removed recording segment %s/%s", self.directory, segment_id)
+
+    def read_index(self, segment_id: int) -> mmap.mmap | None:
+        path = self.index_path(segment_id)
+        if not path.exists() or path.stat().st_size < INDEX_RECORD.size:
+            return None
+        with open(path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def segments(self) -> list[RecordingSegment]:
+        result = []
+        for segment_id in self.segment_ids():
+            index = self.read_index(segment_id)
+            if index is None:
+                continue
+            with index:
+                frames = len(index) // INDEX_RECORD.size
+                last_ms = IndexTimestamps(index)[frames - 1]
+            result.append(
+                RecordingSegment(
+                    id=segment_id,
+                    start=segment_id / 1000,
+                    end=last_ms / 1000,
+                    frames=frames,
+                    size=self.segment_path(segment_id).stat().st_size,
+                )
+            )
+        return result
+
+    def find_frame(self, timestamp_ms: int) -> FrameLocation | None:
+        segment_ids = self.segment_ids()
+        position = bisect_right(segment_ids, timestamp_ms) - 1
+        if position < 0:
+            return None
+        segment_id = segment_ids[position]
+        index = self.read_index(segment_id)
+        if index is None:
+            return None
+        with index:
+            record = max(bisect_right(IndexTimestamps(index), timestamp_ms) - 1, 0)
+            frame_ms, offset, length = INDEX_RECORD.unpack_from(
+                index, record * INDEX_RECORD.size
+            )
+        return FrameLocation(
+            segment=self.segment_path(segment_id),
+            timestamp_ms=frame_ms,
+            offset=offset,
+            length=length,
+        )
+
+
+def read_frame(location: FrameLocation) -> bytes:
+    with open(location.segment, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[location.offset : location.offset + location.length]
+
+
+def iter_segment(path: Path, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset in range(start, end + 1, chunk_size):
+                yield data[offset : min(offset + chunk_size, end + 1)]
+
+
+def create_recorder(printer_name: str) -> CameraRecorder | None:
+    if settings.RECORDING_DIR is None:
+        return None
+    return CameraRecorder(Path(settings.RECORDING_DIR) / printer_name)
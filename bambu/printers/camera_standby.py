@@ -0,0 +1,38 @@
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from bambu import settings
+
+if TYPE_CHECKING:
+    from bambu.printers.printers import Printer
+
+
+class CameraStandby:
+    capacity: int
+    recent: "OrderedDict[str, Printer]"
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.recent = OrderedDict()
+
+    def touch(self, printer: "Printer") -> list["Printer"]:
+        if self.capacity <= 0:
+            return []
+        self.recent[printer.name] = printer
+        self.recent.move_to_end(printer.name)
+
+        evicted = []
+        while len(self.recent) > self.capacity:
+            _, least_recent = self.recent.popitem(last=False)
+            evicted.append(least_recent)
+        return evicted
+
+    def keeps(self, printer: "Printer") -> bool:
+        return self.recent.get(printer.name) is printer
+
+    def discard(self, printer: "Printer") -> None:
+        if self.keeps(printer):
+            del self.recent[printer.name]
+
+
+camera_standby = CameraStandby(settings.CAMERA_STANDBY)
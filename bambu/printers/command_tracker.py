@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any
+
+from bambu.metrics import Histogram
+
+logger = getLogger(__name__)
+
+REQUEST_SECTIONS = ("print", "system", "pushing", "info")
+UNACKNOWLEDGED_SECTIONS = ("pushing",)
+
+
+class CommandTimeout(Exception):
+    pass
+
+
+@dataclass
+class PendingCommand:
+    section: str
+    command: str | None
+    sequence_id: str
+    sent_at: float
+    future: asyncio.Future = field(repr=False)
+    latency_ms: float | None = None
+
+    @property
+    def expects_ack(self) -> bool:
+        return self.section not in UNACKNOWLEDGED_SECTIONS
+
+
+class CommandTracker:
+    pending: dict[str, PendingCommand]
+    latency: dict[str, Histogram]
+
+    def __init__(self) -> None:
+        # Start away from the small ids used by the slicer and other LAN clients.
+        self._sequence = itertools.count(20000 + int(time.time()) % 1_000_000)
+        self.pending = {}
+        self.latency = {}
+
+    def next_sequence_id(self) -> str:
+        return str(next(self._sequence))
+
+    def stamp(self, payload: dict[str, Any]) -> PendingCommand | None:
+        for section in REQUEST_SECTIONS:
+            body = payload.get(section)
+            if isinstance(body, dict):
+                break
+        else:
+            return None
+
+        sequence_id = self.next_sequence_id()
+        body["sequence_id"] = sequence_id
+        pending = PendingCommand(
+            section=section,
+            command=body.get("command"),
+            sequence_id=sequence_id,
+            sent_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        if pending.expects_ack:
+            self.pending[sequence_id] = pending
+        return pending
+
+    def resolve(self, section_payload: dict[str, Any]) -> PendingCommand | None:
+        sequence_id = section_payload.get("sequence_id")
+        if sequence_id is None:
+            return None
+
+        pending = self.pending.get(str(sequence_id))
+        if pending is None:
+            return None
+
+        command = section_payload.get("command")
+        if pending.command is None:
+            if command == "push_status":
+                return None
+        elif command != pending.command:
+            return None
+
+        del self.pending[pending.sequence_id]
+        pending.latency_ms = (time.monotonic() - pending.sent_at) * 1000
+        self.latency.setdefault(
+            pending.command or pending.section, Histogram()
+        ).observe(pending.latency_ms)
+        if not pending.future.done():
+            pending.future.set_result(section_payload)
+        return pending
+
+    async def wait_for_ack(
+        self, pending: PendingCommand, timeout: float
+    ) -> dict[str, Any]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            self.pending.pop(pending.sequence_id, None)
+            raise CommandTimeout(
+                f"No acknowledgement for {pending.command or pending.section} "
+                f"#{pending.sequence_id} within {timeout}s"
+            )
+
+    def fail_all(self, reason: str) -> None:
+        for pending in self.pending.values():
+            if not pending.future.done():
+                pending.future.set_exception(CommandTimeout(reason))
+                pending.future.exception()
+        self.pending.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "latency_ms": {
+                command: histogram.snapshot()
+                for command, histogram in self.latency.items()
+            },
+        }
@@ -0,0 +1,173 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Literal, TypeVar
+
+from bambu import settings
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+ConnectionKind = Literal["mqtt", "camera", "ftps"]
+ConnectionStatus = Literal["idle", "connecting", "connected", "disconnected", "failed"]
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+class ConnectionUnavailable(Exception):
+    pass
+
+
+@dataclass
+class ConnectionState:
+    printer: str
+    kind: ConnectionKind
+    status: ConnectionStatus = "idle"
+    breaker: BreakerState = "closed"
+    consecutive_failures: int = 0
+    failures: int = 0
+    connects: int = 0
+    last_error: str | None = None
+    connected_since: float | None = None
+    retry_at: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "printer": self.printer,
+            "kind": self.kind,
+            "status": self.status,
+            "breaker": self.breaker,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "connects": self.connects,
+            "last_error": self.last_error,
+            "connected_since": self.connected_since,
+            "retry_in": round(max(0.0, self.retry_at - time.monotonic()), 1),
+        }
+
+
+def backoff_delay(failures: int) -> float:
+    delay = min(
+        settings.CONNECT_BACKOFF_MAX,
+        settings.CONNECT_BACKOFF_BASE * 2 ** (failures - 1),
+    )
+    # Half fixed, half random so printers that failed together retry apart.
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class ConnectionSupervisor:
+    states: dict[tuple[str, ConnectionKind], ConnectionState]
+    handshakes: asyncio.Semaphore
+
+    def __init__(self) -> None:
+        self.states = {}
+        self.handshakes = asyncio.Semaphore(settings.CONNECT_CONCURRENCY)
+
+    def state(self, printer: str, kind: ConnectionKind) -> ConnectionState:
+        key = (printer, kind)
+        if (state := self.states.get(key)) is None:
+            state = self.states[key] = ConnectionState(printer, kind)
+        return state
+
+    async def wait(self, printer: str, kind: ConnectionKind) -> None:
+        state = self.state(printer, kind)
+        if (delay := state.retry_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        if state.breaker == "open":
+            state.breaker = "half_open"
+
+    async def attempt(
+        self,
+        printer: str,
+        kind: ConnectionKind,
+        connect: Callable[[], Awaitable[T]],
+        fail_fast: bool = False,
+    ) -> T:
+        state = self.state(printer, kind)
+        if fail_fast:
+            if state.breaker == "open" and state.retry_at > time.monotonic():
+                raise ConnectionUnavailable(
+                    f"{kind} connection to {printer} is failing: {state.last_error}"
+                )
+        else:
+            await self.wait(printer, kind)
+
+        async with self.handshakes:
+            try:
+                result = await connect()
+            except Exception as e:
+                self.failed(printer, kind, e)
+                raise
+        self.connected(printer, kind)
+        return result
+
+    def connected(self, printer: str, kind: ConnectionKind) -> None:
+        state = self.state(printer, kind)
+        state.status = "connecting"
+        state.connects += 1
+        state.connected_since = time.time()
+        state.retry_at = 0.0
+
+    def confirm(self, printer: str, kind: ConnectionKind) -> None:
+        # Only a connection that delivered data resets the backoff.
+        state = self.state(printer, kind)
+        if state.status == "connecting":
+            state.status = "connected"
+            state.breaker = "closed"
+            state.consecutive_failures = 0
+
+    def failed(
+        self, printer: str, kind: ConnectionKind, error: Exception | str
+    ) -> None:
+        state = self.state(printer, kind)
+        state.status = "failed"
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_error = str(error) or type(error).__name__
+        state.connected_since = None
+        now = time.monotonic()
+        if (
+            state.breaker == "half_open"
+            or state.consecutive_failures >= settings.BREAKER_THRESHOLD
+        ):
+            if state.breaker != "open":
+                logger.warning(
+                    "Opening circuit for %s %s after %d failures",
+                    printer,
+                    kind,
+                    state.consecutive_failures,
+                )
+            state.breaker = "open"
+            state.retry_at = now + settings.BREAKER_COOLDOWN
+        else:
+            state.retry_at = now + backoff_delay(state.consecutive_failures)
+
+    def disconnected(
+        self, printer: str, kind: ConnectionKind, error: Exception | str | None = None
+    ) -> None:
+        state = self.state(printer, kind)
+        if state.status == "connecting":
+            self.failed(printer, kind, error or "Closed before sending data")
+            return
+        if state.status != "connected":
+            return
+        state.status = "disconnected"
+        state.connected_since = None
+        if error is not None:
+            state.last_error = str(error) or type(error).__name__
+        # Spread reconnects of printers that dropped at the same time.
+        state.retry_at = time.monotonic() + random.uniform(
+            0, settings.CONNECT_BACKOFF_BASE
+        )
+
+    def forget(self, printer: str) -> None:
+        for key in [key for key in self.states if key[0] == printer]:
+            del self.states[key]
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [state.snapshot() for state in self.states.values()]
+
+
+connection_supervisor = ConnectionSupervisor()
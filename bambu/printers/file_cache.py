@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+from uuid import uuid4
+
+from bambu import settings
+
+logger = getLogger(__name__)
+
+
+class FileCache:
+    directory: Path
+    max_bytes: int
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path_for(
+        self, printer_name: str, file_path: str, size: int, modify: str
+    ) -> Path:
+        # A changed file on the printer gets a new size or modify time and so a new entry.
+        key = f"{printer_name}\0{file_path}\0{size}\0{modify}"
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def lookup(self, path: Path, size: int) -> bool:
+        try:
+            if path.stat().st_size != size:
+                return False
+            # The modification time orders entries for eviction.
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def evict(self) -> None:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def open_temporary(self, path: Path) -> tuple[Path, BinaryIO]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{uuid4().hex}.tmp")
+        return tmp_path, open(tmp_path, "wb")
+
+    def commit(self, tmp_path: Path, path: Path) -> None:
+        os.replace(tmp_path, path)
+        self.evict()
+
+    async def tee(
+        self, blocks: AsyncIterator[bytes], path: Path, size: int
+    ) -> AsyncIterator[bytes]:
+        tmp_path, file = await asyncio.to_thread(self.open_temporary, path)
+        written = 0
+        try:
+            async for block in blocks:
+                await asyncio.to_thread(file.write, block)
+                written += len(block)
+                yield block
+        finally:
+            file.close()
+            # Only complete downloads are kept, an aborted one is discarded.
+            if written == size:
+                await asyncio.to_thread(self.commit, tmp_path, path)
+            else:
+                tmp_path.unlink(missing_ok=True)
+
+
+def create_file_cache() -> FileCache | None:
+    if settings.FILE_CACHE_DIR is None:
+        return None
+    return FileCache(Path(settings.FILE_CACHE_DIR), settings.FILE_CACHE_MAX_BYTES)
+
+
+file_cache = create_file_cache()
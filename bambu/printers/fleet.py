@@ -0,0 +1,296 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from logging import getLogger
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
+from starlette.websockets import WebSocketDisconnect
+
+from bambu import settings
+from bambu.printers import printer_payload
+from bambu.printers.printers import (
+    Printer,
+    SupportedPrinters,
+    discard_payload,
+    printers,
+)
+from bambu.printers.admission import admission
+from bambu.printers.camera_mosaic import MosaicComposer
+from bambu.printers.types_ws import CAMERA_CHANNELS, STATUS_CHANNELS
+from bambu.printers.types_printer import PrinterRequest
+from bambu.printers.upload_store import content_digest
+
+logger = getLogger(__name__)
+
+router = APIRouter()
+
+
+class FleetSelection(BaseModel):
+    names: list[str] | None = None
+    models: list[SupportedPrinters] | None = None
+    idle_only: bool = False
+
+    def candidates(self) -> list[Printer]:
+        if self.names is not None:
+            unknown = [name for name in self.names if name not in printers]
+            if unknown:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Invalid Printer Name: {', '.join(unknown)}",
+                )
+            selected = [printers[name] for name in self.names]
+        else:
+            selected = list(printers.values())
+
+        if self.models is not None:
+            selected = [printer for printer in selected if printer.model in self.models]
+        return selected
+
+
+class MosaicOptions(BaseModel):
+    fps: float
+    tile_width: int
+    tile_height: int
+    columns: int | None
+
+    def composer(self) -> MosaicComposer:
+        return MosaicComposer((self.tile_width, self.tile_height), self.columns)
+
+
+class FleetCommandRequest(BaseModel):
+    printers: FleetSelection = FleetSelection()
+    command: dict[str, Any]
+
+
+class FleetResult(BaseModel):
+    name: str
+    ok: bool
+    duration_ms: float
+    error: str | None = None
+    reply: dict[str, Any] | None = None
+
+
+class FleetResponse(BaseModel):
+    duration_ms: float
+    results: list[FleetResult]
+
+
+@asynccontextmanager
+async def fleet_session(selected: list[Printer]) -> AsyncIterator[None]:
+    async with AsyncExitStack() as stack:
+        for printer in selected:
+            await stack.enter_async_context(
+                printer.client(discard_payload, STATUS_CHANNELS, hold=True)
+            )
+        await asyncio.gather(
+            *[
+                printer.wait_for_status(settings.FLEET_STATUS_TIMEOUT)
+                for printer in selected
+            ]
+        )
+        yield None
+
+
+def rejection(reply: dict[str, Any] | None) -> str | None:
+    # Printers acknowledge a command they refused with a result other than success.
+    if reply is None or (result := reply.get("result")) is None:
+        return None
+    if str(result).lower() == "success":
+        return None
+    return str(reply.get("reason") or f"Printer replied {result}")
+
+
+async def run_on_fleet(
+    selected: list[Printer],
+    operation: Callable[[Printer], Awaitable[dict[str, Any] | None]],
+) -> FleetResponse:
+    semaphore = asyncio.Semaphore(settings.FLEET_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def run(printer: Printer) -> FleetResult:
+        async with semaphore:
+            printer_started = time.perf_counter()
+            try:
+                reply = await operation(printer)
+                error = rejection(reply)
+            except Exception as e:
+                logger.exception("Fleet operation failed for %s", printer.name)
+                reply = None
+                error = str(e) or type(e).__name__
+            return FleetResult(
+                name=printer.name,
+                ok=error is None,
+                duration_ms=(time.perf_counter() - printer_started) * 1000,
+                error=error,
+                reply=reply,
+            )
+
+    results = await asyncio.gather(*[run(printer) for printer in selected])
+    return FleetResponse(
+        duration_ms=(time.perf_counter() - started) * 1000, results=list(results)
+    )
+
+
+async def execute_request(printer: Printer, request: PrinterRequest) -> dict[str, Any]:
+    if request.data.check_idle and not printer.is_idle_print:
+        raise RuntimeError("Printer not Idle")
+    await request.pre_server_command(printer)
+    reply: dict[str, Any] = {}
+    if command := request.to_command():
+        reply = await printer.send_command(command)
+    await request.post_server_command(printer)
+    return reply
+
+
+@asynccontextmanager
+async def camera_session(selected: list[Printer]) -> AsyncIterator[None]:
+    async with AsyncExitStack() as stack:
+        for printer in selected:
+            await stack.enter_async_context(
+                printer.client(discard_payload, CAMERA_CHANNELS, hold=True)
+            )
+        yield None
+
+
+async def mosaic_frames(
+    selected: list[Printer], options: MosaicOptions
+) -> AsyncIterator[bytes]:
+    composer = options.composer()
+    interval = 1 / options.fps
+    async with camera_session(selected):
+        while True:
+            started = time.monotonic()
+            yield await composer.render(selected)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def idle_filter(selected: list[Printer], selection: FleetSelection) -> list[Printer]:
+    if not selection.idle_only:
+        return selected
+    return [printer for printer in selected if printer.is_idle_print]
+
+
+@router.post("/command")
+async def fleet_command(body: FleetCommandRequest) -> FleetResponse:
+    try:
+        request = PrinterRequest.from_printer_json(body.command)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    selected = body.printers.candidates()
+    async with fleet_session(selected):
+        return await run_on_fleet(
+            idle_filter(selected, body.printers),
+            lambda printer: execute_request(printer, request),
+        )
+
+
+@router.post("/upload")
+async def fleet_upload(
+    request: Request,
+    file_name: str,
+    names: list[str] | None = Query(None),
+    models: list[SupportedPrinters] | None = Query(None),
+    idle_only: bool = False,
+    start_print: bool = False,
+) -> FleetResponse:
+    selection = FleetSelection(names=names, models=models, idle_only=idle_only)
+    selected = selection.candidates()
+
+    # Read the request once; every target uploads from the same buffer.
+    file = memoryview(await request.body())
+    if not file:
+        raise HTTPException(status_code=422, detail="Empty file")
+
+    digest = await content_digest(file)
+
+    async def upload(printer: Printer) -> dict[str, Any] | None:
+        if start_print and not printer.is_idle_print:
+            raise RuntimeError("Printer not Idle")
+        outcome = await printer.upload_ftps_file(
+            file=file, file_path=file_name, digest=digest
+        )
+        if start_print and (command := printer_payload.start_print_file(file_name)):
+            return {"upload": outcome, **await printer.send_command(command)}
+        return {"upload": outcome}
+
+    if not (idle_only or start_print):
+        return await run_on_fleet(selected, upload)
+
+    async with fleet_session(selected):
+        return await run_on_fleet(idle_filter(selected, selection), upload)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    # Takes its slot only once sent and holds it until done, iterated or not.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (reason := admission.reserve()) is not None:
+            refusal = JSONResponse(
+                {"detail": reason},
+                status_code=503,
+                headers={"Retry-After": str(settings.OVERLOAD_RETRY_AFTER)},
+            )
+            await refusal(scope, receive, send)
+            return
+        with admission.admitted():
+            await super().__call__(scope, receive, send)
+
+
+def mosaic_options(
+    fps: float = Query(settings.MOSAIC_FPS, gt=0, le=10),
+    tile_width: int = Query(320, ge=32, le=1280),
+    tile_height: int = Query(180, ge=18, le=720),
+    columns: int | None = Query(None, ge=1, le=16),
+) -> MosaicOptions:
+    return MosaicOptions(
+        fps=fps, tile_width=tile_width, tile_height=tile_height, columns=columns
+    )
+
+
+@router.get("/camera/mosaic")
+async def fleet_camera_mosaic(
+    names: list[str] | None = Query(None),
+    models: list[SupportedPrinters] | None = Query(None),
+    options: MosaicOptions = Depends(mosaic_options),
+) -> StreamingResponse:
+    selected = FleetSelection(names=names, models=models).candidates()
+
+    async def parts() -> AsyncIterator[bytes]:
+        async for frame in mosaic_frames(selected, options):
+            yield (
+                b"--frame\r\nContent-Type: image/jpeg\r\n"
+                b"Content-Length: " + str(len(frame)).encode() + b"\r\n\r\n"
+            )
+            yield frame
+            yield b"\r\n"
+
+    return AdmittedStreamingResponse(
+        parts(), media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@router.websocket("/camera/mosaic")
+async def fleet_camera_mosaic_websocket(
+    websocket: WebSocket,
+    names: list[str] | None = Query(None),
+    models: list[SupportedPrinters] | None = Query(None),
+    options: MosaicOptions = Depends(mosaic_options),
+):
+    try:
+        selected = FleetSelection(names=names, models=models).candidates()
+    except HTTPException as e:
+        await websocket.close(code=4004, reason=str(e.detail))
+        return
+    if not await admission.admit(websocket):
+        return
+    with admission.admitted():
+        await websocket.accept()
+        try:
+            async for frame in mosaic_frames(selected, options):
+                await websocket.send_bytes(frame)
+        except WebSocketDisconnect:
+            pass
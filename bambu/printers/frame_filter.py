@@ -0,0 +1,73 @@
+import asyncio
+import io
+import time
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from bambu import settings
+
+THUMBNAIL_SIZE = (64, 36)
+# Brightness steps a thumbnail cell must change by to count, above sensor noise.
+CELL_TOLERANCE = 10
+
+
+def thumbnail(jpeg: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(jpeg))
+    # Lets the JPEG decoder scale down while decoding, far cheaper than a full decode.
+    image.draft("L", (THUMBNAIL_SIZE[0] * 2, THUMBNAIL_SIZE[1] * 2))
+    small = image.convert("L").resize(THUMBNAIL_SIZE, Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.int16)
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    if a.shape != b.shape:
+        return 1.0
+    return float((np.abs(a - b) > CELL_TOLERANCE).mean())
+
+
+class FrameChangeDetector:
+    reference: np.ndarray | None
+
+    def __init__(self) -> None:
+        self.threshold = settings.CAMERA_CHANGE_THRESHOLD
+        self.keepalive = settings.CAMERA_KEEPALIVE
+        self.reference = None
+        self.sent_at = 0.0
+        self.frames = 0
+        self.suppressed = 0
+
+    def reset(self) -> None:
+        self.reference = None
+        self.sent_at = 0.0
+
+    async def should_send(self, jpeg: bytes) -> bool:
+        self.frames += 1
+        if self.threshold <= 0:
+            return True
+        try:
+            current = await asyncio.to_thread(thumbnail, jpeg)
+        except (OSError, ValueError):
+            return True
+
+        now = time.monotonic()
+        if (
+            self.reference is None
+            or now - self.sent_at >= self.keepalive
+            or frame_difference(current, self.reference) >= self.threshold
+        ):
+            # Compare against the last sent frame so slow changes add up.
+            self.reference = current
+            self.sent_at = now
+            return True
+        self.suppressed += 1
+        return False
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "keepalive": self.keepalive,
+            "frames": self.frames,
+            "suppressed": self.suppressed,
+        }
@@ -0,0 +1,351 @@
+import asyncio
+import os
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Literal
+from uuid import uuid4
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+
+from bambu import settings
+from bambu.printers import printer_payload
+from bambu.printers.command_tracker import CommandTimeout
+from bambu.printers.connection_supervisor import backoff_delay
+from bambu.printers.printer_sessions import FleetSessions
+from bambu.printers.printers import Printer, SupportedPrinters, printers
+from bambu.printers.registry import RegistryChange, registry
+from bambu.printers.types_ws import STATUS_CHANNELS
+from bambu.printers.upload_store import content_digest
+
+logger = getLogger(__name__)
+
+router = APIRouter()
+
+JobState = Literal["queued", "dispatching", "printing", "done", "failed", "cancelled"]
+ACTIVE_GCODE_STATES = ("PREPARE", "RUNNING", "PAUSE", "SLICING")
+# A FINISH this long after the start is the job's own, even if never seen running.
+START_GRACE_SECONDS = 120.0
+
+
+class PrintJob(BaseModel):
+    id: str = Field(default_factory=lambda: uuid4().hex)
+    file_name: str
+    priority: int = 0
+    models: list[SupportedPrinters] | None = None
+    printers: list[str] | None = None
+    state: JobState = "queued"
+    printer: str | None = None
+    attempts: int = 0
+    error: str | None = None
+    sha256: str | None = None
+    created_at: float = Field(default_factory=time.time)
+    started_at: float | None = None
+    running_at: float | None = None
+    finished_at: float | None = None
+
+    def accepts(self, printer: Printer) -> bool:
+        if self.models is not None and printer.model not in self.models:
+            return False
+        if self.printers is not None and printer.name not in self.printers:
+            return False
+        return True
+
+
+class JobQueueFile(BaseModel):
+    jobs: list[PrintJob] = []
+
+
+class JobQueue:
+    directory: Path
+    jobs: dict[str, PrintJob]
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.jobs = {}
+        self.lock = asyncio.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "queue.json"
+
+    def file_path(self, job: PrintJob) -> Path:
+        return self.directory / f"{job.id}.3mf"
+
+    def load(self) -> None:
+        if not self.index_path.exists():
+            return
+        stored = JobQueueFile.model_validate_json(self.index_path.read_bytes())
+        self.jobs = {job.id: job for job in stored.jobs}
+        for job in self.jobs.values():
+            # A dispatch interrupted by a restart never reached the printer.
+            if job.state == "dispatching":
+                job.state = "queued"
+                job.printer = None
+        logger.info("Loaded %d print jobs", len(self.jobs))
+
+    def _write_index(self, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.index_path)
+
+    async def save(self) -> None:
+        data = JobQueueFile(jobs=list(self.jobs.values())).model_dump_json(indent=2)
+        await asyncio.to_thread(self._write_index, data.encode())
+
+    async def add(self, job: PrintJob, file: bytes) -> PrintJob:
+        def write_file() -> None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.file_path(job).write_bytes(file)
+
+        await asyncio.to_thread(write_file)
+        job.sha256 = await content_digest(file)
+        self.jobs[job.id] = job
+        await self.save()
+        return job
+
+    async def read_file(self, job: PrintJob) -> bytes:
+        return await asyncio.to_thread(self.file_path(job).read_bytes)
+
+    async def remove_file(self, job: PrintJob) -> None:
+        await asyncio.to_thread(self.file_path(job).unlink, True)
+
+    def queued(self) -> list[PrintJob]:
+        jobs = [job for job in self.jobs.values() if job.state == "queued"]
+        return sorted(jobs, key=lambda job: (-job.priority, job.created_at))
+
+    def next_for(self, printer: Printer) -> PrintJob | None:
+        for job in self.queued():
+            if job.accepts(printer):
+                return job
+        return None
+
+    def assigned_to(self, printer: Printer) -> PrintJob | None:
+        for job in self.jobs.values():
+            if job.printer == printer.name and job.state in ("dispatching", "printing"):
+                return job
+        return None
+
+
+class JobDispatcher:
+    queue: JobQueue
+    sessions: FleetSessions
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.sessions = FleetSessions(STATUS_CHANNELS)
+        self.was_idle: dict[str, bool] = {}
+        self.background_tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self.queue.load()
+        for printer in printers.values():
+            self.attach(printer)
+        registry.listeners.append(self.on_registry_change)
+        await self.update_connections()
+
+    async def stop(self) -> None:
+        registry.listeners.remove(self.on_registry_change)
+        for printer in printers.values():
+            self.detach(printer)
+        await self.sessions.stop()
+
+    async def on_registry_change(
+        self, printer: Printer, change: RegistryChange
+    ) -> None:
+        if change == "added":
+            self.attach(printer)
+        elif change == "replaced":
+            await self.replaced(printer)
+        else:
+            self.detach(printer)
+            self.was_idle.pop(printer.name, None)
+
+    async def replaced(self, printer: Printer) -> None:
+        # The new device reports its own idle change, which dispatches again.
+        self.was_idle.pop(printer.name, None)
+        if job := self.queue.assigned_to(printer):
+            job.error = "Printer replaced in the configuration"
+            await self.finish(job, "failed")
+            logger.info("Job %s on %s failed, printer replaced", job.id, printer.name)
+            await self.update_connections()
+
+    def attach(self, printer: Printer) -> None:
+        if self.on_status not in printer.status_listeners:
+            printer.status_listeners.append(self.on_status)
+
+    def detach(self, printer: Printer) -> None:
+        if self.on_status in printer.status_listeners:
+            printer.status_listeners.remove(self.on_status)
+
+    async def update_connections(self) -> None:
+        # The dispatcher only sees state changes while the printer is connected.
+        if self.queue.queued() and not self.sessions.active:
+            await self.sessions.start()
+            logger.info("Job dispatcher connected to %d printers", len(printers))
+        elif not self.queue.queued() and self.sessions.active:
+            if not any(
+                job.state in ("dispatching", "printing")
+                for job in self.queue.jobs.values()
+            ):
+                await self.sessions.stop()
+                logger.info("Job dispatcher released printer connections")
+
+    def create_background_task(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def on_status(self, printer: Printer, print_payload: dict[str, Any]) -> None:
+        if job := self.queue.assigned_to(printer):
+            await self.track_job(printer, job, print_payload)
+
+        is_idle = printer.is_idle_print and (
+            printer.printer_status_values.get("gcode_state") not in ACTIVE_GCODE_STATES
+        )
+        became_idle = is_idle and not self.was_idle.get(printer.name, False)
+        self.was_idle[printer.name] = is_idle
+        if became_idle:
+            self.create_background_task(self.dispatch(printer))
+
+    async def track_job(
+        self, printer: Printer, job: PrintJob, print_payload: dict[str, Any]
+    ) -> None:
+        gcode_state = print_payload.get("gcode_state")
+        if job.state != "printing" or gcode_state is None:
+            return
+        if gcode_state in ACTIVE_GCODE_STATES:
+            if job.running_at is None:
+                # Persisted so a restart mid-print still completes the job.
+                job.running_at = time.time()
+                await self.queue.save()
+            return
+        if gcode_state not in ("FINISH", "FAILED"):
+            return
+        # The previous print's FINISH may still be reported right after the start.
+        if job.running_at is None and (
+            job.started_at is None or time.time() - job.started_at < START_GRACE_SECONDS
+        ):
+            return
+        await self.finish(job, "done" if gcode_state == "FINISH" else "failed")
+        logger.info("Job %s on %s %s", job.id, printer.name, job.state)
+        await self.update_connections()
+
+    async def finish(self, job: PrintJob, state: JobState) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        await self.queue.save()
+        await self.queue.remove_file(job)
+
+    async def dispatch_all(self) -> None:
+        for printer in printers.values():
+            if self.was_idle.get(printer.name):
+                await self.dispatch(printer)
+
+    async def dispatch(self, printer: Printer) -> None:
+        async with self.queue.lock:
+            if self.queue.assigned_to(printer) is not None:
+                return
+            job = self.queue.next_for(printer)
+            if job is None:
+                return
+            job.state = "dispatching"
+            job.printer = printer.name
+            job.attempts += 1
+            await self.queue.save()
+
+        logger.info("Dispatching job %s to %s", job.id, printer.name)
+        try:
+            await printer.upload_ftps_file(
+                file=await self.queue.read_file(job),
+                file_path=job.file_name,
+                digest=job.sha256,
+            )
+            if command := printer_payload.start_print_file(job.file_name):
+                try:
+                    await printer.send_command(command)
+                except CommandTimeout:
+                    # The start may have arrived even though the ack did not.
+                    if not self.is_printing(printer):
+                        raise
+                    logger.warning(
+                        "Job %s started on %s without an ack", job.id, printer.name
+                    )
+            job.state = "printing"
+            job.started_at = time.time()
+            job.error = None
+            await printer.send_ws_message(f"Print '{job.file_name}' started from queue")
+        except Exception as e:
+            logger.exception("Dispatching job %s to %s failed", job.id, printer.name)
+            job.error = str(e) or type(e).__name__
+            job.printer = None
+            if job.attempts < settings.JOB_MAX_ATTEMPTS:
+                job.state = "queued"
+                # An idle printer reports no new idle change, retry on a timer instead.
+                self.create_background_task(self.retry_later(job.attempts))
+            else:
+                await self.finish(job, "failed")
+                await self.update_connections()
+        finally:
+            await self.queue.save()
+
+    def is_printing(self, printer: Printer) -> bool:
+        return printer.printer_status_values.get("gcode_state") in ACTIVE_GCODE_STATES
+
+    async def retry_later(self, attempts: int) -> None:
+        await asyncio.sleep(backoff_delay(attempts))
+        await self.dispatch_all()
+
+    async def enqueue(self, job: PrintJob, file: bytes) -> PrintJob:
+        await self.queue.add(job, file)
+        await self.update_connections()
+        self.create_background_task(self.dispatch_all())
+        return job
+
+    async def cancel(self, job: PrintJob) -> None:
+        if job.state in ("dispatching", "printing"):
+            raise HTTPException(status_code=409, detail="Job already started")
+        job.state = "cancelled"
+        await self.queue.save()
+        await self.queue.remove_file(job)
+        await self.update_connections()
+
+
+dispatcher = JobDispatcher(JobQueue(Path(settings.DATA_DIR) / "jobs"))
+
+
+@router.get("")
+async def get_jobs() -> list[PrintJob]:
+    return sorted(dispatcher.queue.jobs.values(), key=lambda job: job.created_at)
+
+
+@router.post("")
+async def create_job(
+    request: Request,
+    file_name: str,
+    priority: int = 0,
+    models: list[SupportedPrinters] | None = Query(None),
+    names: list[str] | None = Query(None),
+) -> PrintJob:
+    if names is not None and (unknown := set(names) - set(printers)):
+        raise HTTPException(
+            status_code=404, detail=f"Invalid Printer Name: {', '.join(unknown)}"
+        )
+    file = await request.body()
+    if not file:
+        raise HTTPException(status_code=422, detail="Empty file")
+    job = PrintJob(
+        file_name=file_name, priority=priority, models=models, printers=names
+    )
+    return await dispatcher.enqueue(job, file)
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str) -> PrintJob:
+    job = dispatcher.queue.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid Job")
+    await dispatcher.cancel(job)
+    return job
@@ -0,0 +1,197 @@
+import asyncio
+import gzip
+import zlib
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Self
+
+import msgpack
+
+from bambu import settings
+from bambu.printers.batch_writer import BatchWriter
+
+logger = getLogger(__name__)
+
+# A gzip stream of msgpack [received at in ms, raw payload] records.
+CAPTURE_SUFFIX = ".msgpack.gz"
+CAPTURE_FLUSH_INTERVAL = 1.0
+GZIP_WBITS = zlib.MAX_WBITS | 16
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class CapturedReport:
+    timestamp_ms: int
+    payload: bytes
+
+
+class MqttCapture(BatchWriter):
+    def __init__(self, directory: Path):
+        super().__init__(directory, CAPTURE_FLUSH_INTERVAL, "capture")
+        self.capture_id: int | None = None
+        self.raw_file: BinaryIO | None = None
+        self.file: gzip.GzipFile | None = None
+
+    def add_report(self, payload: bytes) -> None:
+        self.add(payload)
+
+    def close_files(self) -> None:
+        self.close_capture()
+
+    def capture_path(self, capture_id: int) -> Path:
+        return self.directory / f"{capture_id}{CAPTURE_SUFFIX}"
+
+    def open_capture(self, timestamp_ms: int) -> None:
+        self.close_capture()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.capture_id = timestamp_ms
+        # Kept open across batches, close_capture() closes it.
+        self.raw_file = self.capture_path(timestamp_ms).open("ab")
+        self.file = gzip.GzipFile(fileobj=self.raw_file, mode="ab")
+        self.apply_retention()
+
+    def close_capture(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        if self.raw_file is not None:
+            self.raw_file.close()
+        self.file = None
+        self.raw_file = None
+        self.capture_id = None
+
+    def needs_rotation(self, timestamp_ms: int) -> bool:
+        if self.capture_id is None or self.raw_file is None:
+            return True
+        age = (timestamp_ms - self.capture_id) / 1000
+        return (
+            age >= settings.MQTT_CAPTURE_FILE_SECONDS
+            or self.raw_file.tell() >= settings.MQTT_CAPTURE_FILE_BYTES
+        )
+
+    def write_batch(self, batch: list[tuple[int, bytes]]) -> None:
+        for timestamp_ms, payload in batch:
+            if self.needs_rotation(timestamp_ms):
+                self.open_capture(timestamp_ms)
+            assert self.file is not None
+            self.file.write(msgpack.packb([timestamp_ms, payload], use_bin_type=True))
+        if self.file is not None and self.raw_file is not None:
+            # A sync flush keeps the capture readable without the gzip trailer.
+            self.file.flush(zlib.Z_SYNC_FLUSH)
+            self.raw_file.flush()
+
+    def apply_retention(self) -> None:
+        paths = capture_files(self.directory)
+        sizes = {path: path.stat().st_size for path in paths}
+        total = sum(sizes.values())
+        for path in paths:
+            if total <= settings.MQTT_CAPTURE_MAX_BYTES:
+                break
+            if self.capture_id is not None and path == self.capture_path(
+                self.capture_id
+            ):
+                continue
+            path.unlink(missing_ok=True)
+            total -= sizes[path]
+
+
+def capture_files(directory: Path) -> list[Path]:
+    if directory.is_file():
+        return [directory]
+    if not directory.exists():
+        return []
+    return sorted(
+        (
+            path
+            for path in directory.glob(f"*{CAPTURE_SUFFIX}")
+            if path.name.removesuffix(CAPTURE_SUFFIX).isdigit()
+        ),
+        key=lambda path: int(path.name.removesuffix(CAPTURE_SUFFIX)),
+    )
+
+
+def read_capture(path: Path) -> Iterator[CapturedReport]:
+    # Decompresses by hand, gzip refuses a capture still missing its trailer.
+    unpacker = msgpack.Unpacker(raw=False)
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    with open(path, "rb") as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            while chunk:
+                try:
+                    unpacker.feed(decompressor.decompress(chunk))
+                except zlib.error:
+                    logger.warning("Ignoring corrupt end of capture %s", path)
+                    return
+                for timestamp_ms, payload in unpacker:
+                    yield CapturedReport(timestamp_ms, payload)
+                # Appending to an existing capture starts a new gzip member.
+                chunk = decompressor.unused_data
+                if decompressor.eof:
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+
+
+def load_captures(paths: list[Path]) -> list[CapturedReport]:
+    return [report for path in paths for report in read_capture(path)]
+
+
+@dataclass
+class ReplayMessage:
+    topic: str
+    payload: bytes
+
+
+class ReplayClient:
+    # Stands in for the aiomqtt client and delivers captured reports instead.
+    published: list[tuple[str, Any]]
+
+    def __init__(self, reports: list[CapturedReport], topic: str, speed: float = 1.0):
+        self.reports = reports
+        self.topic = topic
+        # 0 replays as fast as the printer consumes the reports.
+        self.speed = speed
+        self.published = []
+        self.delivered = 0
+        self.finished = asyncio.Event()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+    async def subscribe(self, topic: str, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def publish(
+        self, topic: str, payload: Any = None, *args: Any, **kwargs: Any
+    ) -> None:
+        self.published.append((topic, payload))
+
+    async def replay(self) -> AsyncIterator[ReplayMessage]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        remaining = self.reports[self.delivered :]
+        first_ms = remaining[0].timestamp_ms if remaining else 0
+        for report in remaining:
+            if self.speed > 0:
+                due = started + (report.timestamp_ms - first_ms) / 1000 / self.speed
+                if (delay := due - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+            else:
+                # Still lets the broadcaster and subscribers run between reports.
+                await asyncio.sleep(0)
+            self.delivered += 1
+            yield ReplayMessage(self.topic, report.payload)
+        self.finished.set()
+        # A printer that has nothing more to say, not one that disconnected.
+        await asyncio.Event().wait()
+
+    @property
+    def messages(self) -> AsyncIterator[ReplayMessage]:
+        return self.replay()
+
+
+def create_mqtt_capture(printer_name: str) -> MqttCapture | None:
+    if settings.MQTT_CAPTURE_DIR is None:
+        return None
+    return MqttCapture(Path(settings.MQTT_CAPTURE_DIR) / printer_name)
@@ -0,0 +1,83 @@
+import os
+import re
+import tomllib
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from bambu import settings
+
+logger = getLogger(__name__)
+
+SupportedPrinters = Literal["P1S", "P1P", "A1", "A1M"]
+
+ENV_PATTERN = re.compile(
+    r"BAMBUI_PRINTER\.([^.]+)\."
+    r"(IP|ACCESS_CODE|SERIAL|MODEL|MQTT_PORT|CAMERA_PORT|FTP_PORT)"
+)
+
+
+class PrinterConfig(BaseModel):
+    ip: str
+    access_code: str
+    serial: str
+    model: SupportedPrinters
+    mqtt_port: int = 8883
+    camera_port: int = 6000
+    ftp_port: int = 990
+
+
+class PrinterConfigFile(BaseModel):
+    printers: dict[str, PrinterConfig] = {}
+
+
+def parse_printers_from_env() -> dict[str, PrinterConfig]:
+    printers_read: dict[str, dict[str, Any]] = {}
+    for key, value in os.environ.items():
+        match = ENV_PATTERN.match(key)
+        if match:
+            name, attribute = match.groups()
+            if name not in printers_read:
+                printers_read[name] = {}
+            printers_read[name][attribute.lower()] = value
+
+    return {
+        name: PrinterConfig.model_validate(details)
+        for name, details in printers_read.items()
+    }
+
+
+def parse_printers_from_file(path: Path) -> dict[str, PrinterConfig]:
+    content = path.read_bytes()
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("Install PyYAML to use a YAML printer config") from e
+        data = yaml.safe_load(content) or {}
+    else:
+        data = tomllib.loads(content.decode())
+    return PrinterConfigFile.model_validate(data).printers
+
+
+def read_printer_configs() -> dict[str, PrinterConfig]:
+    configs = parse_printers_from_env()
+    if settings.CONFIG_FILE is not None:
+        path = Path(settings.CONFIG_FILE)
+        if path.exists():
+            # Printers from the config file take precedence over env vars.
+            configs.update(parse_printers_from_file(path))
+        else:
+            logger.warning("Printer config %s does not exist", path)
+    return configs
+
+
+def config_mtime() -> float | None:
+    if settings.CONFIG_FILE is None:
+        return None
+    try:
+        return Path(settings.CONFIG_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
@@ -1,11 +1,24 @@
-import ssl
+import time
 from typing import Literal, ClassVar, AsyncIterator
 from contextlib import asynccontextmanager
-from pathlib import PurePosixPath 
+from pathlib import PurePosixPath
 
 from pydantic import BaseModel
 import aioftp
 
+from bambu.printers.connection_supervisor import connection_supervisor
+from bambu.printers.printer_tls import PrinterTls
+
+UploadOutcome = Literal["uploaded", "resumed", "skipped"]
+
+
+class UploadIncomplete(Exception):
+    pass
+
+
+class TransferAbandoned(Exception):
+    pass
+
 
 class PrinterFileSystemEntry(BaseModel):
     entry_type: Literal["file", "dir"]
@@ -29,18 +42,72 @@ class PrinterFileSystemEntry(BaseModel):
         return suffix in self.supported_files
 
 
+def is_permanent_error(error: Exception) -> bool:
+    # 5xx replies such as a missing directory will not go away on retry.
+    if not isinstance(error, aioftp.StatusCodeError):
+        return False
+    return error.received_codes[-1].matches("5xx")
+
+
 @asynccontextmanager
 async def ftps_connection(
-    host: str, password: str, user: str = "bblp", port: int = 990
+    name: str,
+    host: str,
+    password: str,
+    user: str = "bblp",
+    port: int = 990,
+    tls: PrinterTls | None = None,
 ) -> AsyncIterator[aioftp.Client]:
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    client = aioftp.Client(ssl=ctx)
+    tls = tls or PrinterTls()
+    # Data connections are wrapped with the same context and resume its session too.
+    client = aioftp.Client(ssl=tls.context("ftps"))
 
+    async def connect() -> None:
+        try:
+            started = time.perf_counter()
+            await client.connect(host, port=port)
+            tls.connected(
+                "ftps",
+                time.perf_counter() - started,
+                client.stream.writer.get_extra_info("ssl_object"),
+            )
+            await client.login(user, password)
+        except Exception:
+            client.close()
+            raise
+
+    # Uploads are user initiated, fail right away instead of waiting out a backoff.
+    await connection_supervisor.attempt(name, "ftps", connect, fail_fast=True)
+    connection_supervisor.confirm(name, "ftps")
     try:
-        await client.connect(host, port=port)
-        await client.login(user, password)
         yield client
-    finally:
+    except BaseException:
+        # A broken or abandoned transfer leaves the session busy, drop it instead of QUIT.
+        client.close()
+        raise
+    else:
         await client.quit()
+    finally:
+        connection_supervisor.disconnected(name, "ftps")
+
+
+async def remote_file_entry(
+    client: aioftp.Client, path: str
+) -> PrinterFileSystemEntry | None:
+    try:
+        info = await client.stat(path)
+    except aioftp.StatusCodeError:
+        return None
+    return PrinterFileSystemEntry(
+        path=PurePosixPath(path),
+        entry_type="file" if info.get("type") == "file" else "dir",
+        size=info.get("size", "0"),
+        modify=info.get("modify", ""),
+    )
+
+
+async def remote_file_size(client: aioftp.Client, path: str) -> int | None:
+    entry = await remote_file_entry(client, path)
+    if entry is None or not entry.is_file:
+        return None
+    return int(entry.size)
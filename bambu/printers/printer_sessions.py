@@ -0,0 +1,68 @@
+from contextlib import AsyncExitStack
+
+from bambu.printers.printers import Printer, discard_payload, printers
+from bambu.printers.registry import RegistryChange, registry
+from bambu.printers.types_ws import WsChannel
+
+
+class PrinterSessions:
+    channels: frozenset[WsChannel]
+    sessions: dict[str, AsyncExitStack]
+
+    def __init__(self, channels: frozenset[WsChannel]):
+        self.channels = channels
+        self.sessions = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sessions
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    async def hold(self, printer: Printer) -> None:
+        if printer.name in self.sessions:
+            return
+        stack = AsyncExitStack()
+        await stack.enter_async_context(
+            printer.client(discard_payload, self.channels, hold=True)
+        )
+        self.sessions[printer.name] = stack
+
+    async def release(self, name: str) -> None:
+        if stack := self.sessions.pop(name, None):
+            await stack.aclose()
+
+    async def release_all(self) -> None:
+        for name in list(self.sessions):
+            await self.release(name)
+
+
+class FleetSessions(PrinterSessions):
+    active: bool
+
+    def __init__(self, channels: frozenset[WsChannel]):
+        super().__init__(channels)
+        self.active = False
+
+    async def start(self) -> None:
+        if self.active:
+            return
+        self.active = True
+        registry.listeners.append(self.on_registry_change)
+        for printer in list(printers.values()):
+            await self.hold(printer)
+
+    async def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        registry.listeners.remove(self.on_registry_change)
+        await self.release_all()
+
+    async def on_registry_change(
+        self, printer: Printer, change: RegistryChange
+    ) -> None:
+        if change == "added":
+            await self.hold(printer)
+        elif change == "removed":
+            await self.release(printer.name)
@@ -0,0 +1,94 @@
+import ssl
+from typing import Any
+
+from bambu.metrics import Histogram
+from bambu.printers.connection_supervisor import ConnectionKind
+
+HANDSHAKE_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+TlsConnection = ssl.SSLObject | ssl.SSLSocket
+
+
+class ResumingContext(ssl.SSLContext):
+    # Offers the session of the last established connection on every new one.
+    session: ssl.SSLSession | None = None
+    latest: TlsConnection | None = None
+
+    def remember_session(self) -> None:
+        # Read late, TLS 1.3 tickets arrive after the handshake.
+        if self.latest is None:
+            return
+        try:
+            session = self.latest.session
+        except (AttributeError, ValueError):
+            return
+        if session is not None:
+            self.session = session
+
+    def wrap_socket(self, sock: Any, *args: Any, **kwargs: Any) -> ssl.SSLSocket:
+        self.remember_session()
+        if kwargs.get("session") is None:
+            kwargs["session"] = self.session
+        return super().wrap_socket(sock, *args, **kwargs)
+
+    def wrap_bio(self, *args: Any, **kwargs: Any) -> ssl.SSLObject:
+        self.remember_session()
+        if kwargs.get("session") is None:
+            kwargs["session"] = self.session
+        return super().wrap_bio(*args, **kwargs)
+
+
+def create_context() -> ResumingContext:
+    # Printers use self-signed certificates.
+    ctx = ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+class HandshakeStats:
+    def __init__(self) -> None:
+        self.handshakes = 0
+        self.resumed = 0
+        self.duration = Histogram(HANDSHAKE_BUCKETS_MS)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "handshakes": self.handshakes,
+            "resumed": self.resumed,
+            "duration_ms": self.duration.snapshot(),
+        }
+
+
+class PrinterTls:
+    contexts: dict[ConnectionKind, ResumingContext]
+    stats: dict[ConnectionKind, HandshakeStats]
+
+    def __init__(self) -> None:
+        self.contexts = {}
+        self.stats = {}
+
+    def context(self, kind: ConnectionKind) -> ResumingContext:
+        # One context per port, sessions are only valid for the server that issued them.
+        if (ctx := self.contexts.get(kind)) is None:
+            ctx = self.contexts[kind] = create_context()
+        return ctx
+
+    def connected(
+        self, kind: ConnectionKind, seconds: float, connection: object = None
+    ) -> None:
+        # Takes the TLS object of the connection itself, others may be handshaking.
+        ctx = self.context(kind)
+        stats = self.stats.setdefault(kind, HandshakeStats())
+        stats.handshakes += 1
+        stats.duration.observe(seconds * 1000)
+        if not isinstance(connection, (ssl.SSLObject, ssl.SSLSocket)):
+            return
+        if connection.session_reused:
+            stats.resumed += 1
+        ctx.latest = connection
+        ctx.remember_session()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {kind: stats.snapshot() for kind, stats in self.stats.items()}
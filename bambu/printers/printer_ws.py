@@ -1,43 +1,209 @@
+import asyncio
+from contextlib import AsyncExitStack
 from logging import getLogger
-from typing import Any
+from typing import Any, Literal, cast
 
 from fastapi import WebSocket, APIRouter
+from pydantic import BaseModel, ValidationError
 from starlette.websockets import WebSocketState, WebSocketDisconnect
 
+from bambu import serialization, settings
+from bambu.loop_watchdog import printer_task_name
+from bambu.printers.admission import ClientConnection, admission
 from bambu.printers.printers import printers
 from bambu.printers.types_printer import PrinterRequest
+from bambu.printers.types_ws import ALL_CHANNELS, STATUS_CHANNELS, WsChannel, WsError
 
 logger = getLogger(__name__)
 
 router = APIRouter()
 
 
+def parse_channels(channels: str | None) -> frozenset[WsChannel] | None:
+    if channels is None:
+        return ALL_CHANNELS
+    requested = {channel.strip() for channel in channels.split(",") if channel.strip()}
+    if not requested or not requested <= ALL_CHANNELS:
+        return None
+    return cast(frozenset[WsChannel], frozenset(requested))
+
+
 @router.websocket("/printer/{printer_id}")
-async def printer_websocket(websocket: WebSocket, printer_id: str):
+async def printer_websocket(
+    websocket: WebSocket, printer_id: str, channels: str | None = None
+):
     printer = printers.get(printer_id)
     if printer is None:
         await websocket.close(code=4004, reason="Invalid Printer Name")
         return
 
-    await websocket.accept()
+    subscribed_channels = parse_channels(channels)
+    if subscribed_channels is None:
+        await websocket.close(code=4000, reason="Invalid Channels")
+        return
+
+    if not await admission.admit(websocket, printer.name):
+        return
+
+    encoding = serialization.negotiate_encoding(websocket)
+    connection = ClientConnection(websocket, encoding)
+
+    with admission.admitted(printer.name, connection):
+        await websocket.accept(subprotocol=serialization.subprotocol(encoding))
+        connection.start(printer_task_name(printer.name, "ws"))
+        async with printer.client(
+            connection.offer, subscribed_channels, close=websocket.close
+        ):
+            try:
+                while True:
+                    data = await serialization.receive_payload(websocket, encoding)
+                    logger.info(
+                        "Received from user for %s %s %s",
+                        printer.name,
+                        printer.model,
+                        str(data)[:120],
+                    )
+                    if (retry_after := connection.commands.take()) > 0:
+                        admission.commands_limited += 1
+                        await connection.offer(
+                            WsError(
+                                message=f"Too many commands, retry in {retry_after:.1f}s"
+                            ).model_dump()
+                        )
+                        continue
+                    await printer.handle_request(PrinterRequest.from_printer_json(data))
+
+            except WebSocketDisconnect:
+                pass
+            except Exception as e:
+                logger.exception("Error with printer %s", printer_id, exc_info=e)
+            finally:
+                await connection.stop()
+
+
+class FleetSubscribe(BaseModel):
+    type: Literal["subscribe"] = "subscribe"
+    # printer name -> projected fields, None for all fields
+    printers: dict[str, list[str] | None]
+
+
+class FleetStream:
+    websocket: WebSocket
+    encoding: serialization.WsEncoding
+    subscriptions: dict[str, AsyncExitStack]
+    fields: dict[str, list[str] | None]
+    updated: dict[str, dict[str, Any]]
+    last_sent: dict[str, dict[str, Any]]
 
-    async def socket_callback(data: dict[str, Any]) -> None:
-        if websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_json(data)
+    def __init__(self, websocket: WebSocket, encoding: serialization.WsEncoding):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.subscriptions = {}
+        self.fields = {}
+        self.updated = {}
+        self.last_sent = {}
 
-    async with printer.client(socket_callback):
+    async def subscribe(self, name: str, fields: list[str] | None) -> None:
+        self.fields[name] = fields
+        self.last_sent.pop(name, None)
+        printer = printers[name]
+        if name in self.subscriptions:
+            if printer.printer_status_values:
+                self.updated[name] = printer.printer_status_values
+            return
+
+        async def on_status(payload: dict[str, Any]) -> None:
+            self.updated[name] = payload["data"]
+
+        stack = AsyncExitStack()
+        await stack.enter_async_context(printer.client(on_status, STATUS_CHANNELS))
+        self.subscriptions[name] = stack
+        if printer.printer_status_values:
+            self.updated[name] = printer.printer_status_values
+
+    async def unsubscribe(self, name: str) -> None:
+        if stack := self.subscriptions.pop(name, None):
+            await stack.aclose()
+        self.fields.pop(name, None)
+        self.updated.pop(name, None)
+        self.last_sent.pop(name, None)
+
+    async def apply(self, request: FleetSubscribe) -> None:
+        unknown = [name for name in request.printers if name not in printers]
+        if unknown:
+            await self.send(
+                WsError(
+                    message=f"Invalid Printer Name: {', '.join(unknown)}"
+                ).model_dump()
+            )
+        for name in list(self.subscriptions):
+            if name not in request.printers:
+                await self.unsubscribe(name)
+        for name, fields in request.printers.items():
+            if name in printers:
+                await self.subscribe(name, fields)
+
+    def collect_changes(self) -> dict[str, dict[str, Any]]:
+        updated, self.updated = self.updated, {}
+        changes: dict[str, dict[str, Any]] = {}
+        for name, values in updated.items():
+            fields = self.fields.get(name)
+            projected = (
+                dict(values)
+                if fields is None
+                else {field: values[field] for field in fields if field in values}
+            )
+            last_sent = self.last_sent.setdefault(name, {})
+            changed = {
+                field: value
+                for field, value in projected.items()
+                if field not in last_sent or last_sent[field] != value
+            }
+            if changed:
+                last_sent.update(changed)
+                changes[name] = changed
+        return changes
+
+    async def send_updates(self) -> None:
+        while self.websocket.client_state == WebSocketState.CONNECTED:
+            await asyncio.sleep(settings.FLEET_WS_TICK)
+            if changes := self.collect_changes():
+                try:
+                    await self.send({"type": "fleet_status", "data": changes})
+                except (WebSocketDisconnect, RuntimeError):
+                    return
+
+    async def send(self, payload: dict[str, Any]) -> None:
+        await serialization.send_payload(self.websocket, payload, self.encoding)
+
+    async def close(self) -> None:
+        for name in list(self.subscriptions):
+            await self.unsubscribe(name)
+
+
+@router.websocket("/fleet")
+async def fleet_websocket(websocket: WebSocket):
+    if not await admission.admit(websocket):
+        return
+    with admission.admitted():
+        encoding = serialization.negotiate_encoding(websocket)
+        await websocket.accept(subprotocol=serialization.subprotocol(encoding))
+        stream = FleetStream(websocket, encoding)
+        sender = asyncio.create_task(stream.send_updates())
         try:
             while True:
-                data = await websocket.receive_json()
-                logger.info(
-                    "Received from user for %s %s %s",
-                    printer.name,
-                    printer.model,
-                    str(data)[:120],
-                )
-                await printer.handle_request(PrinterRequest.from_printer_json(data))
+                data = await serialization.receive_payload(websocket, encoding)
+                try:
+                    request = FleetSubscribe.model_validate(data)
+                except ValidationError as e:
+                    await stream.send(WsError(message=str(e)).model_dump())
+                    continue
+                await stream.apply(request)
 
         except WebSocketDisconnect:
             pass
         except Exception as e:
-            logger.exception("Error with printer %s", printer_id, exc_info=e)
+            logger.exception("Error with fleet websocket", exc_info=e)
+        finally:
+            sender.cancel()
+            await stream.close()
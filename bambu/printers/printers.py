@@ -1,37 +1,106 @@
-import os
-import re
-import ssl
 import asyncio
+import time
 from logging import getLogger
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Callable, Coroutine, Literal, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncGenerator, AsyncIterator, Callable, Coroutine, Any
 from uuid import uuid4
-import json
 
+import aioftp
 from aiomqtt.client import MqttError, Client as MqttClient
 from bambu_connect.utils.models import PrinterStatus
 from pydantic import BaseModel
 from ping3 import ping
 
+from bambu import serialization, settings
+from bambu.loop_watchdog import printer_task_name
 from bambu.printers.async_camera_client import AsyncCameraClient
+from bambu.printers.camera_recorder import CameraRecorder, create_recorder
+from bambu.printers.camera_standby import camera_standby
+from bambu.printers.connection_supervisor import backoff_delay, connection_supervisor
+from bambu.printers.command_tracker import (
+    CommandTimeout,
+    CommandTracker,
+    PendingCommand,
+)
+from bambu.printers.frame_filter import FrameChangeDetector
+from bambu.printers.mqtt_capture import MqttCapture, ReplayClient, create_mqtt_capture
 from bambu.printers.types_ws import WsJpegImage
+from bambu.printers.printer_config import (
+    PrinterConfig,
+    SupportedPrinters,
+    read_printer_configs,
+)
 from bambu.printers.printer_payload import pushall_command
+from bambu.printers.printer_tls import PrinterTls
+from bambu.printers.status_broadcaster import StatusBroadcaster, is_urgent
+from bambu.printers.status_resync import StatusResync
 from bambu.printers.types_printer import PrinterRequest
-from bambu.printers.types_ws import WsError, WsMessage
-from bambu.printers.printer_ftp import PrinterFileSystemEntry, ftps_connection
+from bambu.printers.types_ws import (
+    ALL_CHANNELS,
+    WsChannel,
+    WsCommandAck,
+    WsError,
+    WsMessage,
+)
+from bambu.printers.printer_ftp import (
+    PrinterFileSystemEntry,
+    TransferAbandoned,
+    UploadIncomplete,
+    UploadOutcome,
+    ftps_connection,
+    is_permanent_error,
+    remote_file_entry,
+    remote_file_size,
+)
+from bambu.printers.upload_store import UploadStore, content_digest, create_upload_store
 
 logger = getLogger(__name__)
 
-SupportedPrinters = Literal["P1S", "P1P", "A1", "A1M"]
+UPLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+ping_executor = ThreadPoolExecutor(
+    max_workers=settings.PING_CONCURRENCY, thread_name_prefix="ping"
+)
+
+StatusListener = Callable[["Printer", dict[str, Any]], Coroutine[Any, Any, None]]
+SubscriberCallback = Callable[[dict[str, Any]], Coroutine[Any, Any, None]]
+SubscriberClose = Callable[[int, str], Coroutine[Any, Any, None]]
+
+
+@dataclass
+class Subscriber:
+    callback: SubscriberCallback
+    channels: frozenset[WsChannel]
+    # Keeps the connections open without receiving payloads or counting as a viewer.
+    hold: bool = False
+    close: SubscriberClose | None = None
 
 
 class Printer:
-    subscribers: dict[str, Callable[[dict[str, Any]], Coroutine[Any, Any, None]]]
+    subscribers: dict[str, Subscriber]
     camera_client: AsyncCameraClient | None
-    mqtt_client: MqttClient | None
+    mqtt_client: MqttClient | ReplayClient | None
+    mqtt_capture: MqttCapture | None
     printer_status: PrinterStatus | None
     printer_status_values: dict[str, Any]
     printer_subscriber_task: asyncio.tasks.Task | None
+    command_tracker: CommandTracker
+    background_tasks: set[asyncio.Task]
+    status_received: asyncio.Event
+    status_listeners: list[StatusListener]
+    status_broadcaster: StatusBroadcaster
+    status_resync: StatusResync
+    recorder: CameraRecorder | None
+    frame_filter: FrameChangeDetector
+    upload_store: UploadStore
+    tls: PrinterTls
+    file_index: list[PrinterFileSystemEntry] | None
+    restored_fields: set[str]
+    camera_linger_task: asyncio.Task | None
 
     name: str
     ip: str
@@ -39,49 +108,90 @@ class Printer:
     serial: str
     model: SupportedPrinters
     username: str = "bblp"
-    port: int = 8883
-    ftp_port: int = 990
+    mqtt_port: int
+    camera_port: int
+    ftp_port: int
 
-    full_push: bool = False
     latest_image: bytes | None = None
 
     def __init__(
-        self, name: str, ip: str, access_code: str, serial: str, model: Literal["P1S"]
+        self,
+        name: str,
+        ip: str,
+        access_code: str,
+        serial: str,
+        model: SupportedPrinters,
+        mqtt_port: int = 8883,
+        camera_port: int = 6000,
+        ftp_port: int = 990,
     ):
         self.name = name
         self.ip = ip
         self.serial = serial
         self.model = model
         self.access_code = access_code
+        self.mqtt_port = mqtt_port
+        self.camera_port = camera_port
+        self.ftp_port = ftp_port
 
         self.subscribers = {}
         self.camera_client = None
         self.mqtt_client = None
+        self.mqtt_capture = create_mqtt_capture(name)
         self.printer_status = None
         self.printer_status_values = {}
         self.printer_subscriber_task = None
+        self.command_tracker = CommandTracker()
+        self.background_tasks = set()
+        self.status_received = asyncio.Event()
+        self.status_listeners = []
+        self.status_broadcaster = StatusBroadcaster(
+            self.broadcast_status, task_name=printer_task_name(name, "status")
+        )
+        self.status_resync = StatusResync()
+        self.recorder = create_recorder(name)
+        self.frame_filter = FrameChangeDetector()
+        self.upload_store = create_upload_store(name)
+        self.tls = PrinterTls()
+        self.file_index = None
+        # Snapshot data shown after a restart until the printer reports it live.
+        self.restored_fields = set()
+        self.image_restored = False
+        self.state_version = 0
+        self.camera_linger_task = None
 
     @property
     def request_topic(self) -> str:
         return f"device/{self.serial}/request"
 
     @property
-    def is_idle_print(self) -> str:
+    def is_idle_print(self) -> bool:
+        if "print_type" in self.restored_fields:
+            return False
         return self.printer_status_values.get("print_type", "").lower() == "idle"
 
     async def image_callback(self, image: bytes) -> None:
         self.latest_image = image
-        await self.callback_all_connected_ws(WsJpegImage.from_bytes(image))
+        self.image_restored = False
+        self.state_version += 1
+        if self.recorder is not None:
+            self.recorder.add_frame(image)
+        # Holds read latest_image themselves, frames are only encoded for viewers.
+        if self.has_viewers("camera") and await self.frame_filter.should_send(image):
+            await self.callback_all_connected_ws(
+                WsJpegImage.from_bytes(image), channel="camera"
+            )
 
     async def start_printer_subscriber(self):
         if self.printer_subscriber_task is None or self.printer_subscriber_task.done():
             self.printer_subscriber_task = asyncio.create_task(
-                self.printer_subscriber()
+                self.printer_subscriber(), name=printer_task_name(self.name, "mqtt")
             )
             logger.info("Created new task for %s", self.name)
 
             def on_done(task: asyncio.tasks.Task):
-                self.full_push = False
+                self.status_received.clear()
+                self.command_tracker.fail_all("Printer connection closed")
                 try:
                     task.result()
                 except asyncio.CancelledError:
@@ -91,73 +201,119 @@ class Printer:
                         "Printer subscriber failed for %s: %s", self.name, e
                     )
                 self.printer_subscriber_task = None
-                if self.subscribers:
-                    self.printer_subscriber_task = asyncio.create_task(
-                        self.start_printer_subscriber()
-                    )
+                if self.subscribers and self.mqtt_client is not None:
+                    self.create_background_task(self.start_printer_subscriber())
 
             self.printer_subscriber_task.add_done_callback(on_done)
 
-    async def start(
-        self, callback: Callable[[dict[str, Any]], Coroutine[Any, Any, None]]
-    ) -> None:
+    def has_subscribers(self, channel: WsChannel) -> bool:
+        return any(
+            channel in subscriber.channels for subscriber in self.subscribers.values()
+        )
+
+    def has_viewers(self, channel: WsChannel) -> bool:
+        return any(
+            channel in subscriber.channels and not subscriber.hold
+            for subscriber in self.subscribers.values()
+        )
+
+    async def update_camera_stream(self) -> None:
+        if self.has_subscribers("camera"):
+            self.cancel_camera_linger()
+            # Recordings and other holds would push viewed printers out of standby.
+            if self.has_viewers("camera"):
+                for evicted in camera_standby.touch(self):
+                    if not evicted.has_subscribers("camera"):
+                        await evicted.update_camera_stream()
+            if self.camera_client is None:
+                self.camera_client = AsyncCameraClient(
+                    hostname=self.ip,
+                    access_code=self.access_code,
+                    port=self.camera_port,
+                    name=self.name,
+                    tls=self.tls,
+                )
+            await self.camera_client.start_stream(self.image_callback)
+        elif self.camera_client is not None and not camera_standby.keeps(self):
+            if settings.CAMERA_LINGER <= 0:
+                await self.stop_camera()
+            elif self.camera_linger_task is None:
+                self.camera_linger_task = asyncio.create_task(
+                    self.stop_camera_after(settings.CAMERA_LINGER),
+                    name=printer_task_name(self.name, "camera_linger"),
+                )
+
+    def cancel_camera_linger(self) -> None:
+        if self.camera_linger_task is not None:
+            self.camera_linger_task.cancel()
+            self.camera_linger_task = None
+
+    async def stop_camera_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self.camera_linger_task = None
+        if not self.has_subscribers("camera") and not camera_standby.keeps(self):
+            await self.stop_camera()
+
+    async def stop_camera(self) -> None:
+        self.cancel_camera_linger()
+        if self.camera_client is not None:
+            await self.camera_client.stop_stream()
+            self.camera_client = None
+            self.frame_filter.reset()
+            logger.info("Camera for %s stopped", self.name)
+
+    async def start(self) -> None:
         if not self.subscribers:
             logger.error("Started Printer Connection without subscribers")
             return
 
-        if self.camera_client is None:
-            self.camera_client = AsyncCameraClient(
-                hostname=self.ip, access_code=self.access_code
-            )
-        if self.camera_client is not None:
-            await self.camera_client.start_stream(self.image_callback)
+        await self.update_camera_stream()
 
         if self.mqtt_client is None:
-            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS)
-            ssl_context.verify_mode = ssl.CERT_NONE
-            ssl_context.check_hostname = False
-            self.mqtt_client = MqttClient(
-                hostname=self.ip,
-                username=self.username,
-                password=self.access_code,
-                port=self.port,
-                tls_insecure=True,
-                tls_context=ssl_context,
-            )
+            self.mqtt_client = self.create_mqtt_client()
             await self.start_printer_subscriber()
 
+    def create_mqtt_client(self) -> MqttClient | ReplayClient:
+        return MqttClient(
+            hostname=self.ip,
+            username=self.username,
+            password=self.access_code,
+            port=self.mqtt_port,
+            tls_insecure=True,
+            tls_context=self.tls.context("mqtt"),
+        )
+
     async def stop(self, force: bool = False) -> None:
-        if self.subscribers and not force:
-            logger.info(
-                "Not stopping %s %s because printer has connected users",
-                self.name,
-                self.model,
-            )
+        if not force:
+            # Lingers or keeps the camera warm instead of stopping it right away.
+            await self.update_camera_stream()
+            if self.subscribers:
+                logger.info(
+                    "Not stopping %s %s because printer has connected users",
+                    self.name,
+                    self.model,
+                )
             return
 
-        if force:
-            logger.info(
-                "Force stopping %s %s despite %d connected users",
-                self.name,
-                self.model,
-                len(self.subscribers),
-            )
-
-        if self.camera_client is not None:
-            await self.camera_client.stop_stream()
-            self.camera_client = None
-
+        logger.info(
+            "Force stopping %s %s despite %d connected users",
+            self.name,
+            self.model,
+            len(self.subscribers),
+        )
+        await self.stop_camera()
         logger.info("Tasks for %s stopped", self.name)
 
     async def callback_all_connected_ws(
-        self, payload: dict[str, Any] | BaseModel
+        self, payload: dict[str, Any] | BaseModel, channel: WsChannel = "messages"
     ) -> None:
-        payload_dict = (
+        payload_dict = serialization.BroadcastPayload(
             payload.model_dump() if isinstance(payload, BaseModel) else payload
         )
 
-        for callback in self.subscribers.values():
-            await callback(payload_dict)
+        for subscriber in list(self.subscribers.values()):
+            if channel in subscriber.channels and not subscriber.hold:
+                await subscriber.callback(payload_dict)
 
     async def send_ws_error(self, message: str) -> None:
         await self.callback_all_connected_ws(WsError(message=message))
@@ -165,101 +321,318 @@ class Printer:
     async def send_ws_message(self, message: str) -> None:
         await self.callback_all_connected_ws(WsMessage(message=message))
 
-    async def publish_request(self, payload: str | dict[str, Any]) -> None:
+    def create_background_task(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(
+            coro, name=printer_task_name(self.name, "background")
+        )
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def publish_request(
+        self, payload: str | bytes | dict[str, Any]
+    ) -> PendingCommand | None:
+        pending = None
         if isinstance(payload, dict):
-            payload = json.dumps(payload)
+            pending = self.command_tracker.stamp(payload)
+            payload = serialization.dumps(payload)
 
         if self.mqtt_client is not None:
             try:
                 logger.info("Publishing %s to %s %s", payload, self.name, self.model)
                 await self.mqtt_client.publish(self.request_topic, payload)
+                return pending
             except MqttError:
                 await self.send_ws_error("Printer MQTT Connection Error")
                 logger.error("Cannot send request because MQTT connection faulty")
         else:
             logger.error("Cannot send request because client not connected")
 
+        if pending is not None:
+            self.command_tracker.pending.pop(pending.sequence_id, None)
+        return None
+
+    async def send_command(
+        self,
+        payload: dict[str, Any],
+        timeout: float = settings.COMMAND_ACK_TIMEOUT,
+    ) -> dict[str, Any]:
+        pending = await self.publish_request(payload)
+        if pending is None:
+            raise CommandTimeout(f"Could not publish command to {self.name}")
+        if not pending.expects_ack:
+            return {}
+        return await self.command_tracker.wait_for_ack(pending, timeout)
+
+    async def notify_command_ack(
+        self, request_type: str, pending: PendingCommand
+    ) -> None:
+        try:
+            reply = await self.command_tracker.wait_for_ack(
+                pending, settings.COMMAND_ACK_TIMEOUT
+            )
+        except CommandTimeout as e:
+            logger.warning("%s %s: %s", self.name, self.model, e)
+            await self.send_ws_error(f"Printer did not confirm '{request_type}'")
+            return
+
+        await self.callback_all_connected_ws(
+            WsCommandAck(
+                request_type=request_type,
+                command=pending.command,
+                sequence_id=pending.sequence_id,
+                result=reply.get("result"),
+                reason=reply.get("reason"),
+                latency_ms=pending.latency_ms or 0.0,
+            )
+        )
+
     async def request_full_push(self) -> None:
-        if not self.full_push:
-            await self.publish_request(json.dumps(pushall_command()))
+        now = time.monotonic()
+        if self.status_resync.due(now) and (command := pushall_command()):
+            self.status_resync.requested(now)
+            await self.publish_request(command)
             logger.info("Requested full push from %s %s", self.name, self.model)
 
     async def handle_system_callback(self, payload: dict[str, str]) -> None:
         pass
 
+    async def notify_status_listeners(self, print_payload: dict[str, Any]) -> None:
+        for listener in list(self.status_listeners):
+            try:
+                await listener(self, print_payload)
+            except Exception:
+                logger.exception("Status listener failed for %s", self.name)
+
+    async def handle_report(self, raw_payload: bytes) -> None:
+        payload = serialization.loads(raw_payload)
+        logger.info("Received from %s %s %s", self.name, self.model, payload)
+
+        urgent = False
+        if print_payload := payload.get("print"):
+            self.command_tracker.resolve(print_payload)
+            urgent = is_urgent(print_payload, self.printer_status_values)
+            self.printer_status_values.update(print_payload)
+            self.restored_fields.difference_update(print_payload)
+            self.state_version += 1
+            self.status_resync.update(print_payload, time.monotonic())
+            if print_payload.get("msg") == 0:
+                self.status_received.set()
+            await self.notify_status_listeners(print_payload)
+
+        elif system_payload := payload.get("system"):
+            self.command_tracker.resolve(system_payload)
+            await self.handle_system_callback(system_payload)
+
+        await self.status_broadcaster.schedule(urgent)
+        await self.request_full_push()
+
+    def status_payload(self) -> dict[str, Any]:
+        stale = self.restored_fields.union(
+            self.status_resync.stale_fields(time.monotonic())
+        )
+        return {
+            "type": "printer_status",
+            "data": self.printer_status_values,
+            "complete": self.status_resync.complete,
+            "stale": sorted(stale),
+        }
+
+    async def broadcast_status(self) -> None:
+        if not self.printer_status_values:
+            return
+        await self.callback_all_connected_ws(self.status_payload(), channel="status")
+
+    def restore(self, state: dict[str, Any]) -> None:
+        # Validated before anything is applied so a bad snapshot leaves no trace.
+        files = None
+        if self.file_index is None and state.get("files") is not None:
+            files = [
+                PrinterFileSystemEntry.model_validate(entry) for entry in state["files"]
+            ]
+        status = state.get("status")
+        if status is not None and not isinstance(status, dict):
+            raise TypeError(f"Snapshot status is a {type(status).__name__}")
+        image = state.get("image")
+        if image is not None and not isinstance(image, bytes):
+            raise TypeError(f"Snapshot image is a {type(image).__name__}")
+        if not self.printer_status_values and status:
+            self.printer_status_values = status
+            self.restored_fields = set(self.printer_status_values)
+        if self.latest_image is None and image:
+            self.latest_image = image
+            self.image_restored = True
+        if files is not None:
+            self.file_index = files
+
     async def printer_subscriber(self) -> None:
         while True:
+            await connection_supervisor.wait(self.name, "mqtt")
             if not await self.ping():
-                await asyncio.sleep(10)
+                connection_supervisor.failed(self.name, "mqtt", "Printer Offline")
                 await self.send_ws_error("Printer Offline")
                 continue
             if self.mqtt_client is None:
                 await asyncio.sleep(0.1)
                 continue
             try:
-                async with self.mqtt_client as client:
-                    await self.request_full_push()
+                async with AsyncExitStack() as stack:
+                    client = await connection_supervisor.attempt(
+                        self.name,
+                        "mqtt",
+                        partial(self.connect_mqtt, stack, self.mqtt_client),
+                    )
+                    self.status_resync.connected()
+                    # Subscribe first so the reply to the pushall is not missed.
                     await client.subscribe(f"device/{self.serial}/report")
+                    await self.request_full_push()
                     async for message in client.messages:
-                        try:
-                            if not isinstance(message.payload, bytes):
-                                logger.error(
-                                    "Printer %s %s sent unexpected %s",
-                                    self.name,
-                                    self.model,
-                                    message.payload,
-                                )
-                                continue
-                            payload = json.loads(message.payload)
-                            logger.info(
-                                "Received from %s %s %s", self.name, self.model, payload
+                        connection_supervisor.confirm(self.name, "mqtt")
+                        if not isinstance(message.payload, bytes):
+                            logger.error(
+                                "Printer %s %s sent unexpected %s",
+                                self.name,
+                                self.model,
+                                message.payload,
                             )
-
-                            if self.printer_status_values is None:
-                                self.printer_status_values = {}
-
-                            if print_payload := payload.get("print"):
-                                self.printer_status_values.update(print_payload)
-                                if print_payload.get("msg") == 0:
-                                    self.full_push = True
-
-                            elif system_payload := payload.get("system"):
-                                await self.handle_system_callback(system_payload)
-
-                            client_payload = {
-                                "type": "printer_status",
-                                "data": self.printer_status_values,
-                            }
-                            if self.full_push:
-                                await self.callback_all_connected_ws(client_payload)
-                            await self.request_full_push()
-
-                        except KeyError:
+                            continue
+                        if self.mqtt_capture is not None:
+                            self.mqtt_capture.add_report(message.payload)
+                        try:
+                            await self.handle_report(message.payload)
+                        except (KeyError, ValueError, AttributeError) as e:
+                            # One malformed report must not drop the connection.
                             logger.error(
-                                "Error while subscribing %s %s", self.name, self.model
+                                "Ignoring malformed report from %s %s: %r",
+                                self.name,
+                                self.model,
+                                e,
                             )
                             continue
-            except MqttError:
-                await asyncio.sleep(3)
+            except MqttError as e:
+                connection_supervisor.disconnected(self.name, "mqtt", e)
+            except Exception as e:
+                # Retried with backoff and the breaker instead of restarting right away.
+                logger.exception("Printer subscriber failed for %s", self.name)
+                connection_supervisor.failed(self.name, "mqtt", e)
+
+    async def connect_mqtt(
+        self, stack: AsyncExitStack, mqtt_client: MqttClient | ReplayClient
+    ) -> MqttClient | ReplayClient:
+        started = time.perf_counter()
+        await stack.enter_async_context(mqtt_client)
+        # paho wraps the socket itself, the replay client has none.
+        paho = getattr(mqtt_client, "_client", None)
+        self.tls.connected(
+            "mqtt",
+            time.perf_counter() - started,
+            paho.socket() if paho is not None else None,
+        )
+        return mqtt_client
 
     @asynccontextmanager
     async def client(
-        self, callback: Callable[[dict[str, Any]], Coroutine[Any, Any, None]]
+        self,
+        callback: SubscriberCallback,
+        channels: frozenset[WsChannel] = ALL_CHANNELS,
+        hold: bool = False,
+        close: SubscriberClose | None = None,
     ) -> AsyncGenerator[None, None]:
         uuid = str(uuid4())
-        self.subscribers[uuid] = callback
-        await self.start(callback)
+        self.subscribers[uuid] = Subscriber(
+            callback=callback, channels=channels, hold=hold, close=close
+        )
+        await self.start()
+        if not hold:
+            await self.send_current_state(callback, channels)
         try:
             yield None
         finally:
             del self.subscribers[uuid]
             await self.stop()
 
+    async def send_current_state(
+        self, callback: SubscriberCallback, channels: frozenset[WsChannel]
+    ) -> None:
+        if "status" in channels and self.printer_status_values:
+            await callback(self.status_payload())
+        if "camera" in channels and self.latest_image and self.camera_client:
+            # A lingering or warm stream already has a frame to show.
+            await callback(
+                WsJpegImage.from_bytes(
+                    self.latest_image, stale=self.image_restored
+                ).model_dump()
+            )
+
+    async def wait_for_status(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.status_received.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    @property
+    def config(self) -> PrinterConfig:
+        return PrinterConfig(
+            ip=self.ip,
+            access_code=self.access_code,
+            serial=self.serial,
+            model=self.model,
+            mqtt_port=self.mqtt_port,
+            camera_port=self.camera_port,
+            ftp_port=self.ftp_port,
+        )
+
+    async def disconnect(self) -> None:
+        await self.stop_camera()
+        camera_standby.discard(self)
+        self.status_broadcaster.cancel()
+        self.mqtt_client = None
+        if self.printer_subscriber_task is not None:
+            task = self.printer_subscriber_task
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.mqtt_capture is not None:
+            await self.mqtt_capture.close()
+        connection_supervisor.forget(self.name)
+        self.printer_status_values = {}
+        self.status_resync = StatusResync()
+        self.latest_image = None
+        self.file_index = None
+        self.restored_fields = set()
+        self.image_restored = False
+
+    def is_same_device(self, config: PrinterConfig) -> bool:
+        return config.ip == self.ip and config.serial == self.serial
+
+    async def reconfigure(self, config: PrinterConfig) -> None:
+        logger.info("Applying new configuration to %s", self.name)
+        await self.disconnect()
+        if not self.is_same_device(config):
+            # Session tickets of the previous device are no use to another host.
+            self.tls = PrinterTls()
+        self.ip = config.ip
+        self.access_code = config.access_code
+        self.serial = config.serial
+        self.model = config.model
+        self.mqtt_port = config.mqtt_port
+        self.camera_port = config.camera_port
+        self.ftp_port = config.ftp_port
+        if self.subscribers:
+            await self.start()
+
+    async def shutdown(self) -> None:
+        await self.send_ws_error("Printer removed from configuration")
+        # Otherwise clients stay attached to a printer that no longer exists.
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.close is not None:
+                with suppress(RuntimeError):
+                    await subscriber.close(4004, "Printer removed from configuration")
+        await self.disconnect()
+
     async def force_refresh(self) -> None:
         logger.info("force restarting %s", self.name)
         await self.stop(force=True)
-        for callback in self.subscribers.values():
-            await self.start(callback)
+        await self.start()
 
     async def handle_request(self, request: PrinterRequest) -> None:
         if request.data.check_idle and not self.is_idle_print:
@@ -268,16 +641,22 @@ class Printer:
             return
         await request.pre_server_command(self)
         if command := request.to_command():
-            await self.publish_request(command)
+            pending = await self.publish_request(command)
+            if pending is not None and pending.expects_ack:
+                self.create_background_task(
+                    self.notify_command_ack(request.data.type, pending)
+                )
         await request.post_server_command(self)
 
     async def list_ftps_files(self) -> list[PrinterFileSystemEntry]:
         files = []
         async with ftps_connection(
+            name=self.name,
             host=self.ip,
             port=self.ftp_port,
             user=self.username,
             password=self.access_code,
+            tls=self.tls,
         ) as client:
             raw_files = await client.list(recursive=False)
             for path, meta in raw_files:
@@ -289,50 +668,142 @@ class Printer:
                         modify=meta["modify"],
                     )
                 )
+        self.file_index = files
+        self.state_version += 1
         return files
 
-    async def upload_ftps_file(self, file: bytes, file_path: str) -> None:
+    async def upload_ftps_file(
+        self, file: bytes | memoryview, file_path: str, digest: str | None = None
+    ) -> UploadOutcome:
+        view = memoryview(file)
+        if digest is None:
+            digest = await content_digest(view)
+        attempt = 1
+        while True:
+            try:
+                return await self.transfer_ftps_file(view, file_path, digest)
+            except (OSError, aioftp.StatusCodeError, UploadIncomplete) as e:
+                if is_permanent_error(e) or attempt >= settings.UPLOAD_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Upload of %s to %s interrupted: %s", file_path, self.name, e
+                )
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    async def transfer_ftps_file(
+        self, view: memoryview, file_path: str, digest: str
+    ) -> UploadOutcome:
+        size = len(view)
         async with ftps_connection(
+            name=self.name,
             host=self.ip,
             port=self.ftp_port,
             user=self.username,
             password=self.access_code,
+            tls=self.tls,
         ) as client:
-            stream = await client.upload_stream(destination=file_path)
-            await stream.write(file)
-            stream.close()
-        return None
+            remote_size = await remote_file_size(client, file_path)
+            stored = self.upload_store.get(file_path)
+            offset = 0
+            if stored is not None and stored.sha256 == digest and stored.size == size:
+                if stored.complete and remote_size == size:
+                    logger.info(
+                        "%s already on %s, skipping upload", file_path, self.name
+                    )
+                    return "skipped"
+                if not stored.complete and remote_size is not None:
+                    # The printer kept what arrived before the transfer broke off.
+                    offset = remote_size if remote_size < size else 0
+            if offset == 0:
+                await self.upload_store.record(file_path, digest, size, complete=False)
+
+            stream = await client.upload_stream(destination=file_path, offset=offset)
+            for start in range(offset, size, UPLOAD_CHUNK_SIZE):
+                await stream.write(view[start : start + UPLOAD_CHUNK_SIZE])
+            await stream.finish()
+
+            remote_size = await remote_file_size(client, file_path)
+            if remote_size != size:
+                await self.upload_store.forget(file_path)
+                raise UploadIncomplete(
+                    f"{file_path} on {self.name} has {remote_size} of {size} bytes"
+                )
+        await self.upload_store.record(file_path, digest, size, complete=True)
+        return "resumed" if offset else "uploaded"
+
+    async def stat_ftps_file(self, file_path: str) -> PrinterFileSystemEntry | None:
+        async with ftps_connection(
+            name=self.name,
+            host=self.ip,
+            port=self.ftp_port,
+            user=self.username,
+            password=self.access_code,
+            tls=self.tls,
+        ) as client:
+            return await remote_file_entry(client, file_path)
+
+    async def download_ftps_file(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        remaining = None if end is None else end - start + 1
+        try:
+            async with ftps_connection(
+                name=self.name,
+                host=self.ip,
+                port=self.ftp_port,
+                user=self.username,
+                password=self.access_code,
+                tls=self.tls,
+            ) as client:
+                stream = await client.download_stream(file_path, offset=start)
+                try:
+                    async for block in stream.iter_by_block(DOWNLOAD_CHUNK_SIZE):
+                        if remaining is not None:
+                            block = block[:remaining]
+                            remaining -= len(block)
+                        yield block
+                        if remaining == 0:
+                            # There is no reliable ABOR, end the session instead.
+                            raise TransferAbandoned
+                    await stream.finish()
+                finally:
+                    stream.close()
+        except TransferAbandoned:
+            pass
 
     async def delete_ftps_file(self, file: bytes, file_path: str) -> None:
         async with ftps_connection(
+            name=self.name,
             host=self.ip,
             port=self.ftp_port,
             user=self.username,
             password=self.access_code,
+            tls=self.tls,
         ) as client:
-            client.remove(path=file_path)
+            await client.remove(path=file_path)
+        await self.upload_store.forget(file_path)
         return None
 
     async def ping(self) -> bool:
-        ping_response = await asyncio.to_thread(ping, dest_addr=self.ip, timeout=1)
+        # Pings block for up to a second, keep them out of the default executor.
+        ping_response = await asyncio.get_running_loop().run_in_executor(
+            ping_executor, partial(ping, dest_addr=self.ip, timeout=1)
+        )
         return bool(ping_response)
 
 
-def parse_printers_from_env() -> dict[str, Printer]:
-    printers_read: dict[str, dict[str, Any]] = {}
-    for key, value in os.environ.items():
-        match = re.match(r"BAMBUI_PRINTER\.([^.]+)\.(IP|ACCESS_CODE|SERIAL|MODEL)", key)
-        if match:
-            name, attribute = match.groups()
-            if name not in printers_read:
-                printers_read[name] = {}
-            printers_read[name][attribute.lower()] = value
+async def discard_payload(payload: Any) -> None:
+    pass
+
 
+def create_printers() -> dict[str, Printer]:
     _printers = {
-        name: Printer(name=name, **details) for name, details in printers_read.items()
+        name: Printer(name=name, **config.model_dump())
+        for name, config in read_printer_configs().items()
     }
     logger.info("Printers: %s", ",".join(_printers.keys()))
     return _printers
 
 
-printers = parse_printers_from_env()
+printers = create_printers()
@@ -0,0 +1,79 @@
+import asyncio
+from logging import getLogger
+from typing import Any, Callable, Coroutine, Literal
+
+from bambu import settings
+from bambu.printers.printer_config import config_mtime, read_printer_configs
+from bambu.printers.printers import Printer, printers
+
+logger = getLogger(__name__)
+
+# replaced: the name now points at another device.
+RegistryChange = Literal["added", "removed", "replaced"]
+RegistryListener = Callable[[Printer, RegistryChange], Coroutine[Any, Any, None]]
+
+
+class PrinterRegistry:
+    listeners: list[RegistryListener]
+    watch_task: asyncio.Task | None
+
+    def __init__(self) -> None:
+        self.listeners = []
+        self.watch_task = None
+        self.mtime = config_mtime()
+        self.lock = asyncio.Lock()
+
+    async def notify(self, printer: Printer, change: RegistryChange) -> None:
+        for listener in list(self.listeners):
+            try:
+                await listener(printer, change)
+            except Exception:
+                logger.exception("Registry listener failed for %s", printer.name)
+
+    async def reload(self) -> None:
+        async with self.lock:
+            try:
+                configs = await asyncio.to_thread(read_printer_configs)
+            except Exception:
+                logger.exception("Invalid printer configuration, keeping current")
+                return
+
+            for name in [name for name in printers if name not in configs]:
+                printer = printers.pop(name)
+                logger.info("Removing printer %s", name)
+                await self.notify(printer, "removed")
+                await printer.shutdown()
+
+            for name, config in configs.items():
+                if (existing := printers.get(name)) is not None:
+                    if existing.config != config:
+                        replaced = not existing.is_same_device(config)
+                        await existing.reconfigure(config)
+                        if replaced:
+                            await self.notify(existing, "replaced")
+                    continue
+                logger.info("Adding printer %s", name)
+                printers[name] = Printer(name=name, **config.model_dump())
+                await self.notify(printers[name], "added")
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(settings.CONFIG_POLL_INTERVAL)
+            mtime = config_mtime()
+            if mtime != self.mtime:
+                self.mtime = mtime
+                logger.info("Printer configuration changed, reloading")
+                await self.reload()
+
+    def start(self) -> None:
+        if settings.CONFIG_FILE is not None and self.watch_task is None:
+            self.watch_task = asyncio.create_task(self.watch())
+
+    async def stop(self) -> None:
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+            await asyncio.gather(self.watch_task, return_exceptions=True)
+            self.watch_task = None
+
+
+registry = PrinterRegistry()
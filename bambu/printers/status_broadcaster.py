@@ -0,0 +1,74 @@
+import asyncio
+from logging import getLogger
+from typing import Any, Callable, Coroutine
+
+from bambu import settings
+
+logger = getLogger(__name__)
+
+URGENT_FIELDS = ("gcode_state", "print_error", "hms")
+
+
+def is_urgent(report: dict[str, Any], previous: dict[str, Any]) -> bool:
+    return any(
+        field in report and report[field] != previous.get(field)
+        for field in URGENT_FIELDS
+    )
+
+
+class StatusBroadcaster:
+    broadcast: Callable[[], Coroutine[Any, Any, None]]
+    flush_task: asyncio.Task | None
+
+    def __init__(
+        self,
+        broadcast: Callable[[], Coroutine[Any, Any, None]],
+        task_name: str | None = None,
+    ):
+        self.broadcast = broadcast
+        self.task_name = task_name
+        self.window = settings.STATUS_COALESCE_WINDOW
+        self.flush_task = None
+        self.reports = 0
+        self.broadcasts = 0
+        self.urgent_broadcasts = 0
+
+    async def schedule(self, urgent: bool = False) -> None:
+        self.reports += 1
+        if urgent or self.window <= 0:
+            if urgent:
+                self.urgent_broadcasts += 1
+            await self.flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(
+                self.flush_later(), name=self.task_name
+            )
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self.flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Status broadcast failed")
+
+    async def flush(self) -> None:
+        self.cancel()
+        self.broadcasts += 1
+        await self.broadcast()
+
+    def cancel(self) -> None:
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "reports": self.reports,
+            "broadcasts": self.broadcasts,
+            "urgent_broadcasts": self.urgent_broadcasts,
+            "coalescing_ratio": (
+                round(self.reports / self.broadcasts, 2) if self.broadcasts else None
+            ),
+        }
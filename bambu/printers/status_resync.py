@@ -0,0 +1,84 @@
+import time
+from typing import Any
+
+from bambu import settings
+
+# A pushall is requested when any of these is missing or has not been reported
+# for BAMBUI_STATUS_STALE_AFTER seconds, at most once per connection.
+REQUIRED_FIELDS = (
+    "gcode_state",
+    "print_type",
+    "mc_percent",
+    "nozzle_temper",
+    "bed_temper",
+)
+
+
+class StatusResync:
+    field_times: dict[str, float]
+    requested_at: float | None
+
+    def __init__(self) -> None:
+        self.field_times = {}
+        self.full_report_received = False
+        self.requested_at = None
+        self.waiting = False
+        self.backoff = settings.PUSHALL_BACKOFF_MIN
+        self.requested_on_connection = False
+        self.requests = 0
+
+    def connected(self) -> None:
+        # A new connection may have missed reports and gets one pushall, the
+        # backoff carries over so a flapping connection does not flood the printer.
+        self.full_report_received = False
+        self.requested_on_connection = False
+
+    def update(self, report: dict[str, Any], now: float) -> None:
+        for field in report:
+            self.field_times[field] = now
+        if report.get("msg") == 0:
+            self.full_report_received = True
+            self.waiting = False
+            self.backoff = settings.PUSHALL_BACKOFF_MIN
+
+    def missing_fields(self) -> list[str]:
+        return [field for field in REQUIRED_FIELDS if field not in self.field_times]
+
+    def stale_fields(self, now: float) -> list[str]:
+        oldest = now - settings.STATUS_STALE_AFTER
+        return [field for field, seen in self.field_times.items() if seen < oldest]
+
+    @property
+    def complete(self) -> bool:
+        return self.full_report_received and not self.missing_fields()
+
+    def due(self, now: float) -> bool:
+        if self.requested_on_connection:
+            return False
+        if self.requested_at is not None and now - self.requested_at < self.backoff:
+            return False
+        if not self.complete:
+            return True
+        oldest = now - settings.STATUS_STALE_AFTER
+        return any(self.field_times[field] < oldest for field in REQUIRED_FIELDS)
+
+    def requested(self, now: float) -> None:
+        if self.waiting:
+            self.backoff = min(self.backoff * 2, settings.PUSHALL_BACKOFF_MAX)
+        self.waiting = True
+        self.requested_at = now
+        self.requested_on_connection = True
+        self.requests += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "complete": self.complete,
+            "missing": self.missing_fields(),
+            "stale": self.stale_fields(now),
+            "pushall_requests": self.requests,
+            "backoff": self.backoff,
+            "field_age": {
+                field: round(now - seen, 1) for field, seen in self.field_times.items()
+            },
+        }
@@ -1,10 +1,10 @@
 from abc import abstractmethod
 from typing import Literal, Self, Any, TYPE_CHECKING, ClassVar
-import json
 from base64 import b64decode
 
 from pydantic import BaseModel, field_validator, Field
 
+from bambu import serialization
 from bambu.printers import printer_payload as pl
 from bambu.printers.printer_payload import RAW_COMMAND_TYPE
 
@@ -230,8 +230,13 @@ class PrintFile(PrinterBaseCommand):
             return v
 
     async def pre_server_command(self, printer: "Printer") -> None:
-        await printer.upload_ftps_file(file=self.file, file_path=self.file_name)
-        await printer.send_ws_message(f"File '{self.file_name}' uploaded")
+        outcome = await printer.upload_ftps_file(
+            file=self.file, file_path=self.file_name
+        )
+        if outcome == "skipped":
+            await printer.send_ws_message(f"File '{self.file_name}' already on printer")
+        else:
+            await printer.send_ws_message(f"File '{self.file_name}' {outcome}")
 
     def to_command(self) -> RAW_COMMAND_TYPE:
         return pl.start_print_file(self.file_name)
@@ -272,9 +277,9 @@ class PrinterRequest(BaseModel):
     def from_printer_json(cls, data: dict[Any, Any] | str) -> Self:
         json_data = data
         if isinstance(data, str):
-            json_data = json.loads(data)
+            json_data = serialization.loads(data)
 
-        return cls.model_validate_json(json.dumps({"data": json_data}))
+        return cls.model_validate_json(serialization.dumps({"data": json_data}))
 
     def to_command(self) -> RAW_COMMAND_TYPE:
         return self.data.to_command()
@@ -3,9 +3,14 @@ import base64
 
 from pydantic import BaseModel
 
+WsChannel = Literal["status", "camera", "messages"]
+ALL_CHANNELS: frozenset[WsChannel] = frozenset(("status", "camera", "messages"))
+STATUS_CHANNELS: frozenset[WsChannel] = frozenset(("status",))
+CAMERA_CHANNELS: frozenset[WsChannel] = frozenset(("camera",))
+
 
 class WsBaseCommand(BaseModel):
-    type: Literal["error", "jpeg_image", "printer_status", "message"]
+    type: Literal["error", "jpeg_image", "printer_status", "message", "command_ack"]
 
 
 class WsError(WsBaseCommand):
@@ -21,7 +26,19 @@ class WsMessage(WsBaseCommand):
 class WsJpegImage(WsBaseCommand):
     type: Literal["jpeg_image"] = "jpeg_image"
     image: str  # base64
+    # Frame restored from a snapshot, not yet replaced by the live camera.
+    stale: bool = False
 
     @classmethod
-    def from_bytes(cls, image: bytes) -> "WsJpegImage":
-        return WsJpegImage(image=base64.b64encode(image).decode("utf-8"))
+    def from_bytes(cls, image: bytes, stale: bool = False) -> "WsJpegImage":
+        return WsJpegImage(image=base64.b64encode(image).decode("utf-8"), stale=stale)
+
+
+class WsCommandAck(WsBaseCommand):
+    type: Literal["command_ack"] = "command_ack"
+    request_type: str
+    command: str | None
+    sequence_id: str
+    result: str | None = None
+    reason: str | None = None
+    latency_ms: float
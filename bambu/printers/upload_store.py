@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import os
+import time
+from logging import getLogger
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from bambu import settings
+
+logger = getLogger(__name__)
+
+
+class StoredFile(BaseModel):
+    path: str
+    sha256: str
+    size: int
+    complete: bool = False
+    updated_at: float = 0.0
+
+
+class UploadStoreFile(BaseModel):
+    files: dict[str, StoredFile] = {}
+
+
+def sha256_digest(file: bytes | memoryview) -> str:
+    return hashlib.sha256(file).hexdigest()
+
+
+async def content_digest(file: bytes | memoryview) -> str:
+    # hashlib releases the GIL for large buffers.
+    return await asyncio.to_thread(sha256_digest, file)
+
+
+# Uploads to one printer's SD card, keyed by remote path.
+class UploadStore:
+    path: Path
+    files: dict[str, StoredFile] | None
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files = None
+
+    def load(self) -> dict[str, StoredFile]:
+        if self.files is None:
+            self.files = {}
+            if self.path.exists():
+                try:
+                    stored = UploadStoreFile.model_validate_json(self.path.read_bytes())
+                    self.files = stored.files
+                except ValueError:
+                    logger.warning("Ignoring unreadable upload record %s", self.path)
+        return self.files
+
+    def get(self, path: str) -> StoredFile | None:
+        return self.load().get(path)
+
+    def _write(self, data: bytes) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.path)
+
+    async def save(self) -> None:
+        data = UploadStoreFile(files=self.load()).model_dump_json(indent=2)
+        await asyncio.to_thread(self._write, data.encode())
+
+    async def record(
+        self, path: str, sha256: str, size: int, complete: bool
+    ) -> StoredFile:
+        stored = StoredFile(
+            path=path,
+            sha256=sha256,
+            size=size,
+            complete=complete,
+            updated_at=time.time(),
+        )
+        self.load()[path] = stored
+        await self.save()
+        return stored
+
+    async def forget(self, path: str) -> None:
+        if self.load().pop(path, None) is not None:
+            await self.save()
+
+
+def create_upload_store(printer_name: str) -> UploadStore:
+    return UploadStore(Path(settings.DATA_DIR) / "uploads" / f"{printer_name}.json")
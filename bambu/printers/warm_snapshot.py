@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+import msgpack
+from pydantic import ValidationError
+
+from bambu import settings
+from bambu.printers.printers import Printer, printers
+
+logger = getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".msgpack"
+
+
+def capture(printer: Printer) -> dict[str, Any]:
+    # Shallow copies on the loop, the encoding happens in a worker thread.
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "serial": printer.serial,
+        "status": dict(printer.printer_status_values),
+        "image": printer.latest_image,
+        "files": (
+            [entry.model_dump(mode="json") for entry in printer.file_index]
+            if printer.file_index is not None
+            else None
+        ),
+    }
+
+
+class SnapshotStore:
+    directory: Path
+    saved_versions: dict[str, int]
+    task: asyncio.Task | None
+
+    def __init__(self, directory: Path, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.saved_versions = {}
+        self.task = None
+
+    def path_for(self, name: str) -> Path:
+        return self.directory / f"{name}{SNAPSHOT_SUFFIX}"
+
+    def write(self, name: str, state: dict[str, Any]) -> None:
+        data = msgpack.packb(state, use_bin_type=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(name)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def read(self, name: str) -> dict[str, Any] | None:
+        path = self.path_for(name)
+        if not path.exists():
+            return None
+        try:
+            state = msgpack.unpackb(path.read_bytes(), raw=False)
+        except (ValueError, msgpack.UnpackException):
+            logger.warning("Ignoring unreadable snapshot %s", path)
+            return None
+        if not isinstance(state, dict) or state.get("version") != SNAPSHOT_VERSION:
+            return None
+        return state
+
+    async def save(self, printer: Printer) -> None:
+        if self.saved_versions.get(printer.name) == printer.state_version:
+            return
+        version = printer.state_version
+        try:
+            await asyncio.to_thread(self.write, printer.name, capture(printer))
+        except OSError:
+            logger.exception("Writing snapshot of %s failed", printer.name)
+            return
+        self.saved_versions[printer.name] = version
+
+    async def save_all(self) -> None:
+        for printer in list(printers.values()):
+            await self.save(printer)
+
+    async def restore_all(self) -> None:
+        restored = 0
+        for printer in list(printers.values()):
+            state = await asyncio.to_thread(self.read, printer.name)
+            if state is None or state.get("serial") != printer.serial:
+                continue
+            try:
+                printer.restore(state)
+            except (ValidationError, TypeError, AttributeError):
+                logger.warning(
+                    "Ignoring unusable snapshot %s", self.path_for(printer.name)
+                )
+                continue
+            self.saved_versions[printer.name] = printer.state_version
+            restored += 1
+        if restored:
+            logger.info("Restored %d printers from snapshots", restored)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save_all()
+            except Exception:
+                logger.exception("Saving snapshots failed")
+
+    async def start(self) -> None:
+        if self.interval <= 0:
+            return
+        await self.restore_all()
+        self.task = asyncio.create_task(self.run(), name="snapshots")
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        await self.save_all()
+
+
+snapshots = SnapshotStore(Path(settings.SNAPSHOT_DIR), settings.SNAPSHOT_INTERVAL)
@@ -0,0 +1,66 @@
+from typing import Any, Literal
+
+import msgpack
+import orjson
+from starlette.websockets import WebSocket
+
+WsEncoding = Literal["json", "msgpack"]
+
+MSGPACK_SUBPROTOCOL = "bambui.msgpack"
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj)
+
+
+class BroadcastPayload(dict[str, Any]):
+    # Encoded once per encoding and shared by all subscribers of a broadcast.
+    encoded: dict[WsEncoding, str | bytes]
+
+    def __init__(self, payload: dict[str, Any]):
+        super().__init__(payload)
+        self.encoded = {}
+
+
+def negotiate_encoding(websocket: WebSocket) -> WsEncoding:
+    if MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return "msgpack"
+    return "json"
+
+
+def subprotocol(encoding: WsEncoding) -> str | None:
+    return MSGPACK_SUBPROTOCOL if encoding == "msgpack" else None
+
+
+def encode_uncached(payload: dict[str, Any], encoding: WsEncoding) -> str | bytes:
+    if encoding == "msgpack":
+        return msgpack.packb(payload)
+    return orjson.dumps(payload).decode()
+
+
+def encode(payload: dict[str, Any], encoding: WsEncoding) -> str | bytes:
+    if not isinstance(payload, BroadcastPayload):
+        return encode_uncached(payload, encoding)
+    if (encoded := payload.encoded.get(encoding)) is None:
+        encoded = payload.encoded[encoding] = encode_uncached(payload, encoding)
+    return encoded
+
+
+async def send_payload(
+    websocket: WebSocket, payload: dict[str, Any], encoding: WsEncoding
+) -> None:
+    encoded = encode(payload, encoding)
+    if isinstance(encoded, bytes):
+        await websocket.send_bytes(encoded)
+    else:
+        await websocket.send_text(encoded)
+
+
+async def receive_payload(websocket: WebSocket, encoding: WsEncoding) -> Any:
+    if encoding == "msgpack":
+        return msgpack.unpackb(await websocket.receive_bytes())
+    return loads(await websocket.receive_text())
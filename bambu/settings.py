@@ -0,0 +1,88 @@
+import os
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_str(name: str, default: str) -> str:
+    return os.environ.get(name) or default
+
+
+def env_optional_str(name: str) -> str | None:
+    return os.environ.get(name) or None
+
+
+HOST = env_str("BAMBUI_HOST", "0.0.0.0")
+PORT = env_int("BAMBUI_PORT", 8080)
+EVENT_LOOP = env_str("BAMBUI_EVENT_LOOP", "auto")
+COMMAND_ACK_TIMEOUT = env_float("BAMBUI_COMMAND_ACK_TIMEOUT", 10.0)
+FLEET_CONCURRENCY = env_int("BAMBUI_FLEET_CONCURRENCY", 4)
+FLEET_STATUS_TIMEOUT = env_float("BAMBUI_FLEET_STATUS_TIMEOUT", 10.0)
+DATA_DIR = env_str("BAMBUI_DATA_DIR", "data")
+SNAPSHOT_DIR = env_str("BAMBUI_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+SNAPSHOT_INTERVAL = env_float("BAMBUI_SNAPSHOT_INTERVAL", 30.0)
+JOB_MAX_ATTEMPTS = env_int("BAMBUI_JOB_MAX_ATTEMPTS", 3)
+UPLOAD_ATTEMPTS = env_int("BAMBUI_UPLOAD_ATTEMPTS", 3)
+FILE_CACHE_DIR = env_optional_str("BAMBUI_FILE_CACHE_DIR")
+FILE_CACHE_MAX_BYTES = env_int("BAMBUI_FILE_CACHE_MAX_BYTES", 2 * 1024**3)
+RECORDING_DIR = env_optional_str("BAMBUI_RECORDING_DIR")
+RECORDING_SEGMENT_SECONDS = env_float("BAMBUI_RECORDING_SEGMENT_SECONDS", 600)
+RECORDING_SEGMENT_BYTES = env_int("BAMBUI_RECORDING_SEGMENT_BYTES", 256 * 1024**2)
+RECORDING_MAX_BYTES = env_int("BAMBUI_RECORDING_MAX_BYTES", 10 * 1024**3)
+RECORDING_MAX_AGE = env_float("BAMBUI_RECORDING_MAX_AGE", 3 * 24 * 3600)
+RECORDING_FLUSH_INTERVAL = env_float("BAMBUI_RECORDING_FLUSH_INTERVAL", 1.0)
+MQTT_CAPTURE_DIR = env_optional_str("BAMBUI_MQTT_CAPTURE_DIR")
+MQTT_CAPTURE_FILE_SECONDS = env_float("BAMBUI_MQTT_CAPTURE_FILE_SECONDS", 3600)
+MQTT_CAPTURE_FILE_BYTES = env_int("BAMBUI_MQTT_CAPTURE_FILE_BYTES", 16 * 1024**2)
+MQTT_CAPTURE_MAX_BYTES = env_int("BAMBUI_MQTT_CAPTURE_MAX_BYTES", 512 * 1024**2)
+FLEET_WS_TICK = env_float("BAMBUI_FLEET_WS_TICK", 0.5)
+STATUS_COALESCE_WINDOW = env_float("BAMBUI_STATUS_COALESCE_WINDOW", 0.15)
+STATUS_STALE_AFTER = env_float("BAMBUI_STATUS_STALE_AFTER", 600.0)
+PUSHALL_BACKOFF_MIN = env_float("BAMBUI_PUSHALL_BACKOFF_MIN", 5.0)
+PUSHALL_BACKOFF_MAX = env_float("BAMBUI_PUSHALL_BACKOFF_MAX", 300.0)
+CONNECT_BACKOFF_BASE = env_float("BAMBUI_CONNECT_BACKOFF_BASE", 1.0)
+CONNECT_BACKOFF_MAX = env_float("BAMBUI_CONNECT_BACKOFF_MAX", 60.0)
+CONNECT_CONCURRENCY = env_int("BAMBUI_CONNECT_CONCURRENCY", 4)
+BREAKER_THRESHOLD = env_int("BAMBUI_BREAKER_THRESHOLD", 5)
+BREAKER_COOLDOWN = env_float("BAMBUI_BREAKER_COOLDOWN", 120.0)
+CAMERA_LINGER = env_float("BAMBUI_CAMERA_LINGER", 15.0)
+CAMERA_STANDBY = env_int("BAMBUI_CAMERA_STANDBY", 0)
+CAMERA_CHANGE_THRESHOLD = env_float("BAMBUI_CAMERA_CHANGE_THRESHOLD", 0.002)
+CAMERA_KEEPALIVE = env_float("BAMBUI_CAMERA_KEEPALIVE", 5.0)
+MOSAIC_FPS = env_float("BAMBUI_MOSAIC_FPS", 1.0)
+MOSAIC_WORKERS = env_int("BAMBUI_MOSAIC_WORKERS", 2)
+LOOP_WATCHDOG_INTERVAL = env_float("BAMBUI_LOOP_WATCHDOG_INTERVAL", 0.1)
+LOOP_STALL_THRESHOLD = env_float("BAMBUI_LOOP_STALL_THRESHOLD", 0.25)
+LOOP_STALL_LOG = env_bool("BAMBUI_LOOP_STALL_LOG", True)
+PING_CONCURRENCY = env_int("BAMBUI_PING_CONCURRENCY", 8)
+WS_MAX_CLIENTS = env_int("BAMBUI_WS_MAX_CLIENTS", 500)
+WS_MAX_CLIENTS_PER_PRINTER = env_int("BAMBUI_WS_MAX_CLIENTS_PER_PRINTER", 50)
+WS_SEND_QUEUE = env_int("BAMBUI_WS_SEND_QUEUE", 32)
+WS_COMMAND_RATE = env_float("BAMBUI_WS_COMMAND_RATE", 5.0)
+WS_COMMAND_BURST = env_int("BAMBUI_WS_COMMAND_BURST", 20)
+OVERLOAD_CHECK_INTERVAL = env_float("BAMBUI_OVERLOAD_CHECK_INTERVAL", 1.0)
+OVERLOAD_LOOP_LAG = env_float("BAMBUI_OVERLOAD_LOOP_LAG", 0.1)
+OVERLOAD_CPU = env_float("BAMBUI_OVERLOAD_CPU", 0.9)
+OVERLOAD_QUEUE = env_float("BAMBUI_OVERLOAD_QUEUE", 0.5)
+OVERLOAD_REDUCED_FPS = env_float("BAMBUI_OVERLOAD_REDUCED_FPS", 1.0)
+OVERLOAD_RETRY_AFTER = env_int("BAMBUI_OVERLOAD_RETRY_AFTER", 10)
+CONFIG_FILE = env_optional_str("BAMBUI_CONFIG")
+CONFIG_POLL_INTERVAL = env_float("BAMBUI_CONFIG_POLL_INTERVAL", 2.0)
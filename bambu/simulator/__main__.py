@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from bambu.simulator.fleet import (
+    create_simulated_fleet,
+    fleet_config,
+    start_fleet,
+    stop_fleet,
+    write_fleet_config,
+)
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    fleet = create_simulated_fleet(
+        args.printers,
+        host=args.host,
+        report_interval=args.report_interval,
+        camera_fps=args.camera_fps,
+    )
+    await start_fleet(fleet)
+    if args.config is not None:
+        write_fleet_config(fleet, args.config)
+    else:
+        print(fleet_config(fleet))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_fleet(fleet)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run simulated Bambu printers")
+    parser.add_argument("--printers", type=int, default=3)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--report-interval", type=float, default=1.0)
+    parser.add_argument("--camera-fps", type=float, default=2.0)
+    parser.add_argument(
+        "--config", type=Path, help="write the printer config for BAMBUI_CONFIG here"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import asyncio
+from pathlib import Path
+
+from bambu.simulator.simulated_printer import SimulatedPrinter
+
+
+def create_simulated_fleet(
+    count: int,
+    host: str = "127.0.0.1",
+    report_interval: float = 1.0,
+    camera_fps: float = 2.0,
+) -> list[SimulatedPrinter]:
+    return [
+        SimulatedPrinter(
+            name=f"sim{index:03d}",
+            serial=f"SIM{index:09d}",
+            access_code=f"{index:08d}",
+            host=host,
+            report_interval=report_interval,
+            camera_fps=camera_fps,
+        )
+        for index in range(count)
+    ]
+
+
+async def start_fleet(fleet: list[SimulatedPrinter]) -> None:
+    await asyncio.gather(*(printer.start() for printer in fleet))
+
+
+async def stop_fleet(fleet: list[SimulatedPrinter]) -> None:
+    await asyncio.gather(*(printer.stop() for printer in fleet))
+
+
+def fleet_config(fleet: list[SimulatedPrinter]) -> str:
+    lines = []
+    for printer in fleet:
+        lines.append(f"[printers.{printer.name}]")
+        for key, value in printer.printer_config().items():
+            lines.append(
+                f"{key} = {value!r}" if isinstance(value, int) else f'{key} = "{value}"'
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_fleet_config(fleet: list[SimulatedPrinter], path: Path) -> None:
+    path.write_text(fleet_config(fleet))
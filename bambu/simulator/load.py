@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import msgpack
+from websockets.asyncio.client import connect
+from websockets.typing import Subprotocol
+
+from bambu import serialization
+from bambu.metrics import Histogram
+from bambu.simulator.fleet import (
+    create_simulated_fleet,
+    start_fleet,
+    stop_fleet,
+    write_fleet_config,
+)
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass
+class LoadStats:
+    latency: Histogram = field(default_factory=Histogram)
+    messages: int = 0
+    frames: int = 0
+    bytes_received: int = 0
+    errors: int = 0
+
+
+def process_usage(pid: int) -> tuple[float, int]:
+    # utime and stime are fields 14 and 15, counted after the command name.
+    stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(stat[11]) + int(stat[12])) / CLOCK_TICKS
+    rss_pages = int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+    return cpu_seconds, rss_pages * PAGE_SIZE
+
+
+async def wait_for_server(base_url: str) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(
+                urllib.request.urlopen, f"{base_url}/healthz", None, 1
+            )
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+
+
+async def run_client(
+    url: str, args: argparse.Namespace, stats: LoadStats, stop: asyncio.Event
+) -> None:
+    last_sim_ts = None
+    subprotocols = (
+        [Subprotocol(serialization.MSGPACK_SUBPROTOCOL)] if args.msgpack else None
+    )
+    try:
+        async with connect(
+            url,
+            max_size=None,
+            compression=None if args.compression == "none" else args.compression,
+            subprotocols=subprotocols,
+        ) as websocket:
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+                except TimeoutError:
+                    continue
+                received = time.time()
+                stats.bytes_received += len(raw)
+                message: dict[str, Any] = (
+                    msgpack.unpackb(raw) if args.msgpack else serialization.loads(raw)
+                )
+                if message.get("type") == "jpeg_image":
+                    stats.frames += 1
+                    continue
+                stats.messages += 1
+                if message.get("type") != "printer_status":
+                    continue
+                sim_ts = message["data"].get("sim_ts")
+                if sim_ts is not None and sim_ts != last_sim_ts:
+                    last_sim_ts = sim_ts
+                    stats.latency.observe((received - sim_ts) * 1000)
+    except Exception:
+        stats.errors += 1
+
+
+async def run_load(args: argparse.Namespace) -> dict[str, Any]:
+    fleet = create_simulated_fleet(
+        args.printers,
+        report_interval=args.report_interval,
+        camera_fps=args.camera_fps,
+    )
+    await start_fleet(fleet)
+
+    config_dir = tempfile.TemporaryDirectory()
+    config_path = Path(config_dir.name) / "printers.toml"
+    write_fleet_config(fleet, config_path)
+    env = {
+        **os.environ,
+        "BAMBUI_CONFIG": str(config_path),
+        "BAMBUI_DATA_DIR": config_dir.name,
+    }
+    server = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "bambu.main:app",
+        "--port",
+        str(args.port),
+        "--log-level",
+        "warning",
+        "--loop",
+        args.loop,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    stats = LoadStats()
+    stop = asyncio.Event()
+    try:
+        async with asyncio.timeout(30):
+            await wait_for_server(base_url)
+        channels = "status,camera" if args.camera else "status"
+        clients = [
+            asyncio.create_task(
+                run_client(
+                    f"ws://127.0.0.1:{args.port}/ws/printer/{printer.name}"
+                    f"?channels={channels}",
+                    args,
+                    stats,
+                    stop,
+                )
+            )
+            for printer in fleet
+            for _ in range(args.clients)
+        ]
+        await asyncio.sleep(args.warmup)
+        stats.latency = Histogram()
+        stats.messages = stats.frames = stats.bytes_received = 0
+        cpu_start, _ = process_usage(server.pid)
+        started = time.monotonic()
+
+        await asyncio.sleep(args.duration)
+
+        elapsed = time.monotonic() - started
+        cpu_end, rss = process_usage(server.pid)
+        stop.set()
+        await asyncio.gather(*clients)
+    finally:
+        server.terminate()
+        await server.wait()
+        await stop_fleet(fleet)
+        config_dir.cleanup()
+
+    return {
+        "printers": args.printers,
+        "clients_per_printer": args.clients,
+        "loop": args.loop,
+        "duration": round(elapsed, 2),
+        "status_messages_per_second": round(stats.messages / elapsed, 1),
+        "frames_per_second": round(stats.frames / elapsed, 1),
+        "megabytes_per_second": round(stats.bytes_received / elapsed / 1e6, 3),
+        "client_errors": stats.errors,
+        "fanout_latency_ms": stats.latency.snapshot(),
+        "server_cpu_percent": round((cpu_end - cpu_start) / elapsed * 100, 1),
+        "server_rss_mb": round(rss / 1e6, 1),
+        "reports_published": sum(printer.reports_sent for printer in fleet),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run simulated printers against a local server and measure it"
+    )
+    parser.add_argument("--printers", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=10, help="per printer")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--report-interval", type=float, default=1.0)
+    parser.add_argument("--camera", action="store_true", help="subscribe to camera")
+    parser.add_argument("--camera-fps", type=float, default=2.0)
+    parser.add_argument("--msgpack", action="store_true", help="use msgpack frames")
+    parser.add_argument("--compression", choices=("deflate", "none"), default="deflate")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--loop", choices=("auto", "asyncio", "uvloop"), default="auto")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_load(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
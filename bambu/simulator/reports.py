@@ -0,0 +1,236 @@
+import random
+import time
+from typing import Any
+
+GCODE_STATE_DURATIONS = {
+    "IDLE": 30.0,
+    "PREPARE": 10.0,
+    "RUNNING": 600.0,
+    "FINISH": 20.0,
+}
+
+
+def ams_report() -> dict[str, Any]:
+    return {
+        "ams": [
+            {
+                "humidity": "4",
+                "id": "0",
+                "temp": "24.6",
+                "tray": [
+                    {
+                        "id": str(tray),
+                        "tray_type": "PLA",
+                        "tray_color": color,
+                        "tray_sub_brands": "PLA Basic",
+                        "tray_weight": "1000",
+                        "tray_diameter": "1.75",
+                        "nozzle_temp_max": "230",
+                        "nozzle_temp_min": "190",
+                        "remain": random.randint(10, 100),
+                        "k": 0.02,
+                        "n": 1,
+                    }
+                    for tray, color in enumerate(
+                        ("FFFFFFFF", "000000FF", "F72323FF", "0A2989FF")
+                    )
+                ],
+            }
+        ],
+        "ams_exist_bits": "1",
+        "tray_exist_bits": "f",
+        "tray_now": "255",
+        "tray_pre": "255",
+        "tray_tar": "255",
+        "version": 4,
+    }
+
+
+class SimulatedPrintState:
+    def __init__(self, serial: str, auto_print: bool = True):
+        self.serial = serial
+        self.auto_print = auto_print
+        self.sequence = 0
+        self.gcode_state = "IDLE"
+        self.reported_gcode_state = ""
+        self.state_since = time.monotonic()
+        self.subtask_name = ""
+        self.mc_percent = 0
+        self.layer_num = 0
+        self.total_layer_num = 250
+        self.nozzle_temper = 25.0
+        self.nozzle_target_temper = 0.0
+        self.bed_temper = 24.0
+        self.bed_target_temper = 0.0
+        self.chamber_temper = 23.0
+        self.light = "off"
+        self.speed_level = 2
+
+    def next_sequence_id(self) -> str:
+        self.sequence += 1
+        return str(self.sequence)
+
+    def set_gcode_state(self, gcode_state: str) -> None:
+        self.gcode_state = gcode_state
+        self.state_since = time.monotonic()
+        if gcode_state == "PREPARE":
+            self.mc_percent = 0
+            self.layer_num = 0
+            self.nozzle_target_temper = 220.0
+            self.bed_target_temper = 55.0
+        elif gcode_state in ("FINISH", "IDLE", "FAILED"):
+            self.nozzle_target_temper = 0.0
+            self.bed_target_temper = 0.0
+
+    @property
+    def print_type(self) -> str:
+        return "idle" if self.gcode_state in ("IDLE", "FINISH", "FAILED") else "local"
+
+    def advance(self) -> None:
+        elapsed = time.monotonic() - self.state_since
+        duration = GCODE_STATE_DURATIONS.get(self.gcode_state)
+        if self.gcode_state == "RUNNING" and duration:
+            self.mc_percent = min(int(elapsed / duration * 100), 100)
+            self.layer_num = int(self.total_layer_num * self.mc_percent / 100)
+
+        if duration is not None and elapsed >= duration:
+            if self.gcode_state == "IDLE" and self.auto_print:
+                self.subtask_name = "benchy.3mf"
+                self.set_gcode_state("PREPARE")
+            elif self.gcode_state == "PREPARE":
+                self.set_gcode_state("RUNNING")
+            elif self.gcode_state == "RUNNING":
+                self.set_gcode_state("FINISH")
+            elif self.gcode_state == "FINISH":
+                self.set_gcode_state("IDLE")
+
+        self.nozzle_temper += (self.nozzle_target_temper - self.nozzle_temper) * 0.2
+        self.nozzle_temper += random.uniform(-0.3, 0.3)
+        self.bed_temper += (self.bed_target_temper - self.bed_temper) * 0.1
+        self.bed_temper += random.uniform(-0.2, 0.2)
+
+    def delta_report(self) -> dict[str, Any]:
+        self.advance()
+        report: dict[str, Any] = {
+            "command": "push_status",
+            "msg": 1,
+            "sequence_id": self.next_sequence_id(),
+            "nozzle_temper": round(self.nozzle_temper, 2),
+            "bed_temper": round(self.bed_temper, 2),
+            "wifi_signal": f"-{random.randint(38, 60)}dBm",
+            "sim_ts": time.time(),
+        }
+        if self.gcode_state != self.reported_gcode_state:
+            self.reported_gcode_state = self.gcode_state
+            report.update(
+                gcode_state=self.gcode_state,
+                print_type=self.print_type,
+                subtask_name=self.subtask_name,
+                nozzle_target_temper=self.nozzle_target_temper,
+                bed_target_temper=self.bed_target_temper,
+            )
+        if self.gcode_state == "RUNNING":
+            report.update(
+                mc_percent=self.mc_percent,
+                mc_remaining_time=max(0, 100 - self.mc_percent) * 6,
+                layer_num=self.layer_num,
+            )
+        return {"print": report}
+
+    def full_report(self) -> dict[str, Any]:
+        self.advance()
+        self.reported_gcode_state = self.gcode_state
+        return {
+            "print": {
+                "command": "push_status",
+                "msg": 0,
+                "sequence_id": self.next_sequence_id(),
+                "ams": ams_report(),
+                "ams_rfid_status": 0,
+                "ams_status": 0,
+                "bed_target_temper": self.bed_target_temper,
+                "bed_temper": round(self.bed_temper, 2),
+                "big_fan1_speed": "0",
+                "big_fan2_speed": "0",
+                "chamber_temper": self.chamber_temper,
+                "cooling_fan_speed": "15" if self.gcode_state == "RUNNING" else "0",
+                "fail_reason": "0",
+                "fan_gear": 0,
+                "force_upgrade": False,
+                "gcode_file": self.subtask_name,
+                "gcode_file_prepare_percent": "100",
+                "gcode_start_time": str(int(time.time())),
+                "gcode_state": self.gcode_state,
+                "heatbreak_fan_speed": "15",
+                "hms": [],
+                "home_flag": 322454935,
+                "hw_switch_state": 0,
+                "ipcam": {
+                    "ipcam_dev": "1",
+                    "ipcam_record": "enable",
+                    "timelapse": "disable",
+                    "resolution": "1080p",
+                    "tutk_server": "disable",
+                    "mode_bits": 2,
+                },
+                "layer_num": self.layer_num,
+                "lifecycle": "product",
+                "lights_report": [{"node": "chamber_light", "mode": self.light}],
+                "maintain": 3,
+                "mc_percent": self.mc_percent,
+                "mc_print_error_code": "0",
+                "mc_print_stage": "2" if self.gcode_state == "RUNNING" else "1",
+                "mc_print_sub_stage": 0,
+                "mc_remaining_time": max(0, 100 - self.mc_percent) * 6,
+                "mess_production_state": "active",
+                "nozzle_diameter": "0.4",
+                "nozzle_target_temper": self.nozzle_target_temper,
+                "nozzle_temper": round(self.nozzle_temper, 2),
+                "nozzle_type": "stainless_steel",
+                "online": {"ahb": False, "rfid": False, "version": 7},
+                "print_error": 0,
+                "print_gcode_action": 0,
+                "print_real_action": 0,
+                "print_type": self.print_type,
+                "profile_id": "",
+                "project_id": "",
+                "queue_number": 0,
+                "s_obj": [],
+                "sdcard": True,
+                "spd_lvl": self.speed_level,
+                "spd_mag": 100,
+                "stg": [],
+                "stg_cur": 255,
+                "subtask_id": "",
+                "subtask_name": self.subtask_name,
+                "task_id": "",
+                "total_layer_num": self.total_layer_num,
+                "upgrade_state": {"sequence_id": 0, "progress": "", "status": ""},
+                "upload": {"status": "idle", "progress": 0, "message": ""},
+                "vt_tray": {"id": "254", "tray_type": "", "tray_color": "00000000"},
+                "wifi_signal": "-45dBm",
+                "xcam": {"buildplate_marker_detector": True},
+                "sim_ts": time.time(),
+            }
+        }
+
+    def handle_command(self, section: str, body: dict[str, Any]) -> dict[str, Any]:
+        command = body.get("command")
+        if section == "print":
+            if command == "project_file":
+                self.subtask_name = str(body.get("subtask_name", ""))
+                self.set_gcode_state("PREPARE")
+            elif command == "stop":
+                self.set_gcode_state("IDLE")
+            elif command == "pause" and self.gcode_state == "RUNNING":
+                self.set_gcode_state("PAUSE")
+            elif command == "resume" and self.gcode_state == "PAUSE":
+                self.set_gcode_state("RUNNING")
+            elif command == "print_speed":
+                self.speed_level = int(body.get("param", self.speed_level))
+        elif section == "system" and "led_mode" in body:
+            self.light = str(body["led_mode"])
+
+        reply = {**body, "result": "success", "reason": ""}
+        reply.setdefault("sequence_id", self.next_sequence_id())
+        return {section: reply}
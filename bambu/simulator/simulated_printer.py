@@ -0,0 +1,315 @@
+import asyncio
+import io
+import json
+import ssl
+import struct
+import time
+from functools import partial
+from importlib import resources
+from logging import getLogger
+from typing import Any
+
+import aioftp
+from PIL import Image, ImageDraw
+
+from bambu.simulator.reports import SimulatedPrintState
+
+logger = getLogger(__name__)
+
+USERNAME = "bblp"
+
+MQTT_CONNECT = 1
+MQTT_PUBLISH = 3
+MQTT_SUBSCRIBE = 8
+MQTT_UNSUBSCRIBE = 10
+MQTT_PINGREQ = 12
+MQTT_DISCONNECT = 14
+
+
+def server_ssl_context() -> ssl.SSLContext:
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    with resources.as_file(
+        resources.files("bambu.simulator").joinpath("simulator.pem")
+    ) as pem:
+        ctx.load_cert_chain(pem)
+    return ctx
+
+
+def render_frames(count: int, width: int = 640, height: int = 360) -> list[bytes]:
+    frames = []
+    for index in range(count):
+        image = Image.new("RGB", (width, height), (32, 32, 36))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((40, height - 60, width - 40, height - 40), fill=(90, 90, 90))
+        offset = int((width - 160) * index / max(count - 1, 1))
+        draw.rectangle((40 + offset, 120, 120 + offset, height - 60), fill=(0, 150, 80))
+        buffer = io.BytesIO()
+        # The camera client looks for a JFIF header (FF D8 FF E0).
+        image.save(buffer, format="JPEG", quality=70)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def encode_remaining_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def mqtt_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes([packet_type << 4 | flags]) + encode_remaining_length(len(body)) + body
+
+
+async def read_mqtt_packet(reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+    header = (await reader.readexactly(1))[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        multiplier *= 128
+        if not byte & 0x80:
+            break
+    return header >> 4, header & 0x0F, await reader.readexactly(length)
+
+
+def read_string(data: bytes, offset: int) -> tuple[str, int]:
+    (length,) = struct.unpack_from("!H", data, offset)
+    start = offset + 2
+    return data[start : start + length].decode(), start + length
+
+
+class SimulatedPrinter:
+    def __init__(
+        self,
+        name: str,
+        serial: str,
+        access_code: str,
+        host: str = "127.0.0.1",
+        mqtt_port: int = 0,
+        camera_port: int = 0,
+        ftp_port: int = 0,
+        report_interval: float = 1.0,
+        camera_fps: float = 2.0,
+    ):
+        self.name = name
+        self.serial = serial
+        self.access_code = access_code
+        self.host = host
+        self.mqtt_port = mqtt_port
+        self.camera_port = camera_port
+        self.ftp_port = ftp_port
+        self.report_interval = report_interval
+        self.camera_fps = camera_fps
+        self.state = SimulatedPrintState(serial)
+        self.frames = render_frames(12)
+        self.report_subscribers: set[asyncio.Queue[bytes]] = set()
+        self.servers: list[asyncio.AbstractServer] = []
+        self.ftp_server: aioftp.Server | None = None
+        self.tasks: set[asyncio.Task] = set()
+        self.reports_sent = 0
+        self.frames_sent = 0
+
+    @property
+    def report_topic(self) -> str:
+        return f"device/{self.serial}/report"
+
+    @property
+    def request_topic(self) -> str:
+        return f"device/{self.serial}/request"
+
+    def printer_config(self) -> dict[str, Any]:
+        return {
+            "ip": self.host,
+            "access_code": self.access_code,
+            "serial": self.serial,
+            "model": "P1S",
+            "mqtt_port": self.mqtt_port,
+            "camera_port": self.camera_port,
+            "ftp_port": self.ftp_port,
+        }
+
+    async def start(self) -> None:
+        ctx = server_ssl_context()
+        mqtt_server = await asyncio.start_server(
+            self.handle_mqtt, self.host, self.mqtt_port, ssl=ctx
+        )
+        camera_server = await asyncio.start_server(
+            self.handle_camera, self.host, self.camera_port, ssl=ctx
+        )
+        self.servers = [mqtt_server, camera_server]
+        self.mqtt_port = mqtt_server.sockets[0].getsockname()[1]
+        self.camera_port = camera_server.sockets[0].getsockname()[1]
+
+        # Share one in-memory file system between all FTP sessions.
+        filesystem = aioftp.MemoryPathIO().state
+        self.ftp_server = aioftp.Server(
+            [aioftp.User(USERNAME, self.access_code)],
+            path_io_factory=partial(aioftp.MemoryPathIO, state=filesystem),
+            ssl=ctx,
+        )
+        await self.ftp_server.start(self.host, self.ftp_port)
+        assert self.ftp_server.server is not None
+        self.ftp_port = self.ftp_server.server.sockets[0].getsockname()[1]
+
+        task = asyncio.create_task(self.publish_reports())
+        self.tasks.add(task)
+        logger.info(
+            "Simulated printer %s on %s mqtt=%d camera=%d ftp=%d",
+            self.name,
+            self.host,
+            self.mqtt_port,
+            self.camera_port,
+            self.ftp_port,
+        )
+
+    async def stop(self) -> None:
+        for server in self.servers:
+            server.close()
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.ftp_server is not None:
+            await self.ftp_server.close()
+
+    def broadcast_report(self, report: dict[str, Any]) -> None:
+        payload = json.dumps(report).encode()
+        for queue in self.report_subscribers:
+            queue.put_nowait(payload)
+        self.reports_sent += 1
+
+    async def publish_reports(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            if self.report_subscribers:
+                self.broadcast_report(self.state.delta_report())
+
+    def handle_request(self, payload: bytes) -> None:
+        request = json.loads(payload)
+        if request.get("pushing", {}).get("command") == "pushall":
+            self.broadcast_report(self.state.full_report())
+            return
+        for section in ("print", "system"):
+            if isinstance(body := request.get(section), dict):
+                self.broadcast_report(self.state.handle_command(section, body))
+
+    def track_connection(self) -> asyncio.Task:
+        task = asyncio.current_task()
+        assert task is not None
+        self.tasks.add(task)
+        return task
+
+    async def handle_mqtt(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = self.track_connection()
+        outgoing: asyncio.Queue[bytes] = asyncio.Queue()
+
+        async def send_reports() -> None:
+            while True:
+                payload = await outgoing.get()
+                body = encode_string(self.report_topic) + payload
+                writer.write(mqtt_packet(MQTT_PUBLISH, 0, body))
+                await writer.drain()
+
+        sender = asyncio.create_task(send_reports())
+        try:
+            packet_type, _, body = await read_mqtt_packet(reader)
+            if packet_type != MQTT_CONNECT:
+                return
+            if not self.check_credentials(body):
+                writer.write(mqtt_packet(2, 0, b"\x00\x05"))
+                return
+            writer.write(mqtt_packet(2, 0, b"\x00\x00"))
+
+            while True:
+                packet_type, flags, body = await read_mqtt_packet(reader)
+                if packet_type == MQTT_PUBLISH:
+                    topic, offset = read_string(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        packet_id = body[offset : offset + 2]
+                        offset += 2
+                        writer.write(mqtt_packet(4, 0, packet_id))
+                    if topic == self.request_topic:
+                        self.handle_request(body[offset:])
+                elif packet_type == MQTT_SUBSCRIBE:
+                    packet_id = body[:2]
+                    offset, granted = 2, bytearray()
+                    while offset < len(body):
+                        topic, offset = read_string(body, offset)
+                        offset += 1
+                        granted.append(0)
+                        if topic == self.report_topic:
+                            self.report_subscribers.add(outgoing)
+                    writer.write(mqtt_packet(9, 0, packet_id + bytes(granted)))
+                elif packet_type == MQTT_UNSUBSCRIBE:
+                    self.report_subscribers.discard(outgoing)
+                    writer.write(mqtt_packet(11, 0, body[:2]))
+                elif packet_type == MQTT_PINGREQ:
+                    writer.write(mqtt_packet(13, 0, b""))
+                elif packet_type == MQTT_DISCONNECT:
+                    return
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        except asyncio.CancelledError:
+            # Only cancelled by stop(), end the connection quietly.
+            pass
+        finally:
+            self.report_subscribers.discard(outgoing)
+            self.tasks.discard(task)
+            sender.cancel()
+            writer.close()
+
+    def check_credentials(self, body: bytes) -> bool:
+        _, offset = read_string(body, 0)
+        connect_flags = body[offset + 1]
+        offset += 4
+        _, offset = read_string(body, offset)
+        if connect_flags & 0x04:
+            _, offset = read_string(body, offset)
+            _, offset = read_string(body, offset)
+        username = password = None
+        if connect_flags & 0x80:
+            username, offset = read_string(body, offset)
+        if connect_flags & 0x40:
+            password, offset = read_string(body, offset)
+        return username == USERNAME and password == self.access_code
+
+    async def handle_camera(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = self.track_connection()
+        try:
+            auth = await reader.readexactly(80)
+            username = auth[16:48].rstrip(b"\x00").decode()
+            access_code = auth[48:80].rstrip(b"\x00").decode()
+            if username != USERNAME or access_code != self.access_code:
+                return
+
+            index = 0
+            started = time.monotonic()
+            while True:
+                frame = self.frames[index % len(self.frames)]
+                writer.write(struct.pack("<IIII", len(frame), 0, 1, 0) + frame)
+                await writer.drain()
+                self.frames_sent += 1
+                index += 1
+                next_frame = started + index / self.camera_fps
+                await asyncio.sleep(max(0.0, next_frame - time.monotonic()))
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.tasks.discard(task)
+            writer.close()